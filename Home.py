@@ -1,9 +1,25 @@
+import time
+RUN_STARTED = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+from collections import deque
 from pathlib import Path
-from typing import Dict
-from PIL import Image
+from typing import Dict, Optional, Tuple
+
+from price_store import INDEX_FILE, read_prices, read_item_index, rebuild_item_index, display_name, partition_path, period_start
+from price_matrix import PriceMatrix, META_FILE, mask_outside_range, nan_mean, to_long
+from rolling import RollingMedianCache
+from plot_cache import PlotDataCache
+from market_index import load_market_index
+from downsampling import choose_resolution, days_to_periods, downsample_long, max_points_for
+from fetch_metrics import FetchMetrics
+
+# plotly is imported where a graph is built, reruns without a graph never load it.
+
+# Timings of this rerun, shown in the "Page Timings" expander.
+page_metrics = FetchMetrics()
+page_metrics.add_time("imports", time.perf_counter() - RUN_STARTED)
 
 st.set_page_config(page_title="Steam Market Analyzer", layout="wide")
 
@@ -12,35 +28,209 @@ APP_DIR = Path(__file__).resolve().parent
 DATA_DIR = APP_DIR / "data" / "Main page"
 TEXTS_AND_PICTURE_DIR = DATA_DIR / "texts and pictures"
 EVENTS_CSV = DATA_DIR / "events.csv"
+PRICE_STORE_DIR = APP_DIR / "data" / "price_store"
+PRICE_MATRIX_DIR = APP_DIR / "data" / "price_matrix"
 
 # Data loaders to load given data from the given paths.
-@st.cache_data
-def load_histories():
+TIMING_HISTORY_SIZE = 50  # reruns kept for the timing report
+ITEM_CACHE_SIZE = 64  # price series kept in memory, the least recently used ones are dropped
+VERSION_CACHE_SIZE = 4  # older versions of the index and events kept after a file changed
+
+def file_fingerprint(fp: Path) -> Optional[Tuple[str, int, int]]:
+    """
+    Cheap version of a file: path, modification time and size, read with one stat call.
+    The loaders take it as an argument, so a rewritten file is a new cache key and is read again
+    while unchanged files stay cached.
+
+    Args:
+        fp: The path of the file
+    Returns:
+        fingerprint: (path, mtime in ns, size), None if the file does not exist.
     """
-    Loads all *_history.csv files and returns them as dataframes.
+    try:
+        stat = fp.stat()
+    except OSError:
+        return None
+    return (str(fp), stat.st_mtime_ns, stat.st_size)
+
+def sources_fingerprint():
+    """
+    Fingerprint of everything the item index is built from: the index file of the store,
+    or every *_history.csv when there is no store.
 
     Args:
         ---
     Returns:
-        dfs: Dataframes with the expected colums: timestamp, price_mean, price_median, volume_sum.
+        fingerprint: Hashable tuple, it changes when a file is added, removed or rewritten.
     """
-    dfs = {}
-    for fp in DATA_DIR.glob("*_history.csv"):
+    store_index = file_fingerprint(PRICE_STORE_DIR / INDEX_FILE)
+    if store_index is not None:
+        return ("store", store_index)
+    return ("csv", _csv_fingerprints())
+
+def _csv_fingerprints():
+    return tuple(sorted(filter(None, (file_fingerprint(fp) for fp in DATA_DIR.glob("*_history.csv")))))
+
+@st.cache_data
+def _csv_summary(fingerprint: Tuple[str, int, int]):
+    """
+    Reads the first and last date and the row count of a *_history.csv without parsing the series.
+    Cached per file version, a refresh only reads the files that changed.
+
+    Args:
+        fingerprint: The fingerprint of the csv file
+    Returns:
+        start, end, rows: The date range and number of rows.
+    """
+    raw = Path(fingerprint[0]).read_bytes()
+    lines = raw.strip().split(b"\n")
+    rows = max(len(lines) - 1, 0)
+    if rows == 0:
+        return pd.NaT, pd.NaT, 0
+    first = lines[1].split(b",", 1)[0].decode("utf-8", errors="ignore")
+    last = lines[-1].split(b",", 1)[0].decode("utf-8", errors="ignore")
+    return pd.to_datetime(first, errors="coerce"), pd.to_datetime(last, errors="coerce"), rows
+
+@st.cache_data(max_entries=VERSION_CACHE_SIZE)
+def load_item_index(fingerprint):
+    """
+    Lists all items with their game, date range and row count, without loading any price series.
+    The index of the parquet price store is used if it exists, otherwise the *_history.csv files are listed.
+
+    Args:
+        fingerprint: The result of sources_fingerprint(), the index is rebuilt when it changes.
+    Returns:
+        index: Dataframe indexed by item name with the colums game, item, source, start, end, rows.
+    """
+    if PRICE_STORE_DIR.is_dir():
+        index = read_item_index(str(PRICE_STORE_DIR))
+        if index.empty:
+            index = rebuild_item_index(str(PRICE_STORE_DIR))
+        if not index.empty:
+            index["name"] = [display_name(g, i, p) for g, i, p in zip(index["game"], index["item"], index["prefix"])]
+            index["source"] = "store"
+            return index.set_index("name")
+
+    rows = []
+    csv_fingerprints = fingerprint[1] if fingerprint[0] == "csv" else _csv_fingerprints()
+    for csv_fingerprint in csv_fingerprints:
+        fp = Path(csv_fingerprint[0])
         try:
-            df = pd.read_csv(fp, parse_dates=["timestamp"])
+            start, end, n = _csv_summary(csv_fingerprint)
             name = fp.stem.replace("_history", "").replace("_", " ")
-            dfs[name] = df
+            rows.append({"name": name, "game": "", "item": name, "source": str(fp), "start": start, "end": end, "rows": n})
         except Exception as e:
             st.write(f"Error loading: {fp}: {e}")
-    return dfs
+    return pd.DataFrame(rows, columns=["name", "game", "item", "source", "start", "end", "rows"]).set_index("name")
 
-@st.cache_data
-def load_events(csv_path: Path):
+@st.cache_data(max_entries=ITEM_CACHE_SIZE)
+def load_item(game: str, item: str, source: str, fingerprint, resolution: str = "D"):
+    """
+    Loads the price history of one item, only called for items that are selected.
+
+    Args:
+        game: The game label of the item (store only)
+        item: The market hash name of the item (store only)
+        source: "store" or the path of the csv file
+        fingerprint: The fingerprint of the file the item is read from, see item_fingerprint().
+        resolution: "D" for daily prices, "W" or "M" for the weekly or monthly rollups of the store.
+    Returns:
+        df: Dataframe with the expected colums: timestamp, price_mean, price_median, volume_sum.
+    """
+    if source == "store":
+        df = read_prices(str(PRICE_STORE_DIR), items=[item], games=[game], resolution=resolution,
+                         columns=["timestamp", "price_mean", "price_median", "volume_sum"])
+        return df.reset_index(drop=True)
+    return pd.read_csv(source, parse_dates=["timestamp"])
+
+def item_fingerprint(game: str, source: str, resolution: str = "D"):
+    """
+    Fingerprint of the file one item is read from (its game partition or its csv file).
+    """
+    if source == "store":
+        return file_fingerprint(Path(partition_path(str(PRICE_STORE_DIR), game, resolution)))
+    return file_fingerprint(Path(source))
+
+@st.cache_resource(max_entries=1)
+def load_price_matrix(version: float):
+    """
+    Opens the memory-mapped date x item matrix of median prices, shared by all sessions.
+
+    Args:
+        version: The modification time of the matrix metadata, a rebuilt matrix is opened again.
+    Returns:
+        matrix: The PriceMatrix.
+    """
+    return PriceMatrix(str(PRICE_MATRIX_DIR))
+
+@st.cache_resource
+def rolling_cache():
+    """
+    Process-wide cache of rolled item rows, shared by all sessions.
+    """
+    return RollingMedianCache()
+
+@st.cache_resource
+def plot_data_cache():
+    """
+    Process-wide LRU cache of the derived plot data, keyed by the filter state.
+    """
+    return PlotDataCache()
+
+@st.cache_data(max_entries=VERSION_CACHE_SIZE)
+def load_text(fingerprint: Tuple[str, int, int]):
+    """
+    Reads a static text file once per file version.
+
+    Args:
+        fingerprint: The fingerprint of the file, see file_fingerprint.
+    Returns:
+        text: The content of the file.
+    """
+    with open(fingerprint[0], "r", encoding="utf-8") as f:
+        return f.read()
+
+@st.cache_data(max_entries=VERSION_CACHE_SIZE)
+def load_image(fingerprint: Tuple[str, int, int]):
+    """
+    Reads a static image once per file version, st.image shows the encoded bytes without decoding them here.
+
+    Args:
+        fingerprint: The fingerprint of the file, see file_fingerprint.
+    Returns:
+        image: The bytes of the file.
+    """
+    return Path(fingerprint[0]).read_bytes()
+
+@st.cache_resource
+def timing_history():
+    """
+    Total time of the first run and the recent reruns of this process, shared by all sessions.
+    """
+    return {"first": None, "reruns": deque(maxlen=TIMING_HISTORY_SIZE)}
+
+@st.cache_data(max_entries=VERSION_CACHE_SIZE)
+def load_market_comparison(base_date, window: int, fingerprint):
+    """
+    Computes the normalized market index of every game from the price store.
+
+    Args:
+        base_date: Items are normalized to their first price from this date on (=100).
+        window: The smoothing window in days.
+        fingerprint: The result of sources_fingerprint(), recomputed when the store changes.
+    Returns:
+        index: Dataframe, see market_index.compute_market_index.
+    """
+    return load_market_index(str(PRICE_STORE_DIR), base_date=base_date, window=window)
+
+@st.cache_data(max_entries=VERSION_CACHE_SIZE)
+def load_events(csv_path: Path, fingerprint):
     """
     Loads the events.csv file and returns two dataframes.
 
     Args:
         csv_path: The path of the csv file
+        fingerprint: The fingerprint of the csv file, edits are picked up on the next rerun.
     Returns:
         ev_lines: Dataframe for the single day events.
         ev_spans Dataframe for the timeframe events.
@@ -83,6 +273,13 @@ def load_events(csv_path: Path):
 
     return ev_lines, ev_spans
 
+# Colors of the games in the market comparison.
+GAME_COLORS: Dict[str, str] = {
+    "CS": "#F58231",
+    "TF2": "#4363D8",
+    "Dota": "#E6194B",
+}
+
 # Different colors for different types of events.
 CATEGORY_COLORS: Dict[str, str] = {
     "Major": "red",
@@ -93,113 +290,218 @@ CATEGORY_COLORS: Dict[str, str] = {
 }
 DEFAULT_COLOR = "gray"
 
-def add_events_to_figure(fig, ev_lines: pd.DataFrame, ev_spans: pd.DataFrame, selected_categories, show_labels=True, label_angle=-45):
+def filter_events(ev_lines: pd.DataFrame, ev_spans: pd.DataFrame, selected_categories, x_range=None):
     """
-    Draws the events into the graph.
+    Selects the events that are drawn, with vectorized filters.
 
     Args:
-        fig: Graph with the given data, but without the events added.
         ev_lines: Data for the line (one day) events.
         ev_spans: Data dor the timeframe events.
         selected_categories: Gives the categories that are supposed to be shown.
-        show_labels: Are the labels for the events supposed to be shown.
+        x_range: Optional (start, end), events outside of it are not drawn.
     Returns:
-        ---
+        lines, spans: The events to draw, spans with start <= end.
     """
     # if no categories selected -> show nothing
     if not selected_categories:
-        return
-    
-    # Drawing line (only one day) events into the graph.
-    for _, row in ev_lines.iterrows():
-        if selected_categories and row["category"] not in selected_categories:
-            continue
-        color = CATEGORY_COLORS.get(row["category"], DEFAULT_COLOR)
-        d = row["date"]
-        if pd.isna(d):
-            continue
-        d = pd.to_datetime(d).to_pydatetime()
-        
-        fig.add_shape(
-            type="line",
-            x0=d, x1=d,
-            y0=0, y1=1,
-            xref="x", yref="paper",
-            line=dict(color=color, width=2, dash="dash"),
-            layer="above"
-        )
+        return ev_lines.iloc[0:0], ev_spans.iloc[0:0]
+
+    lines, spans = ev_lines, ev_spans
+    if not lines.empty:
+        lines = lines[lines["category"].isin(selected_categories) & lines["date"].notna()]
+        if x_range is not None:
+            lines = lines[(lines["date"] >= x_range[0]) & (lines["date"] <= x_range[1])]
+
+    if not spans.empty:
+        spans = spans[spans["category"].isin(selected_categories) & spans["start"].notna() & spans["end"].notna()]
+        # safety for mixed up start and end of the timeframe
+        spans = spans.assign(start=spans[["start", "end"]].min(axis=1), end=spans[["start", "end"]].max(axis=1))
+        if x_range is not None:
+            spans = spans[(spans["end"] >= x_range[0]) & (spans["start"] <= x_range[1])]
+    return lines, spans
+
+def add_events_to_figure(fig, ev_lines: pd.DataFrame, ev_spans: pd.DataFrame, show_labels=True, label_angle=-45):
+    """
+    Draws the events into the graph.
+    All shapes and annotations are added to the layout at once, so the figure is only validated once.
 
-        # Give a lable to the drawn line
-        if show_labels and row.get("label"):
-            fig.add_annotation(
-                x=d, y=1.02,
+    Args:
+        fig: Graph with the given data, but without the events added.
+        ev_lines: Line (one day) events to draw, see filter_events.
+        ev_spans: Timeframe events to draw, see filter_events.
+        show_labels: Are the labels for the events supposed to be shown.
+    Returns:
+        ---
+    """
+    shapes, annotations = [], []
+
+    # Line (only one day) events.
+    if not ev_lines.empty:
+        colors = ev_lines["category"].map(CATEGORY_COLORS).fillna(DEFAULT_COLOR)
+        for d, color, label in zip(ev_lines["date"].dt.to_pydatetime(), colors, ev_lines["label"]):
+            shapes.append(dict(
+                type="line",
+                x0=d, x1=d,
+                y0=0, y1=1,
                 xref="x", yref="paper",
-                text=str(row["label"]),
-                showarrow=False,
-                font=dict(size=14, color=color),
-                align="center",
-                textangle=label_angle
-            )
-
-    # Drawing events wich involve a timeframe into the graph.
-    for _, row in ev_spans.iterrows():
-        if selected_categories and row["category"] not in selected_categories:
-            continue
-        color = CATEGORY_COLORS.get(row["category"], DEFAULT_COLOR)
-        s, e = row["start"], row["end"]
-        if pd.isna(s) or pd.isna(e):
-            continue
-        s = pd.to_datetime(s).to_pydatetime()
-        e = pd.to_datetime(e).to_pydatetime()
-        if e < s:
-            s, e = e, s  # safety for mixed up start and end of the timeframe
-
-        fig.add_shape(
-            type="rect",
-            x0=s, x1=e,
-            y0=0, y1=1,
-            xref="x", yref="paper",
-            fillcolor=color, opacity=0.12,
-            line=dict(width=0),
-            layer="below"
+                line=dict(color=color, width=2, dash="dash"),
+                layer="above"
+            ))
+            # Give a lable to the drawn line
+            if show_labels and label:
+                annotations.append(dict(
+                    x=d, y=1.02,
+                    xref="x", yref="paper",
+                    text=str(label),
+                    showarrow=False,
+                    font=dict(size=14, color=color),
+                    align="center",
+                    textangle=label_angle
+                ))
+
+    # Events wich involve a timeframe.
+    if not ev_spans.empty:
+        colors = ev_spans["category"].map(CATEGORY_COLORS).fillna(DEFAULT_COLOR)
+        for s, e, color, label in zip(ev_spans["start"].dt.to_pydatetime(), ev_spans["end"].dt.to_pydatetime(),
+                                      colors, ev_spans["label"]):
+            shapes.append(dict(
+                type="rect",
+                x0=s, x1=e,
+                y0=0, y1=1,
+                xref="x", yref="paper",
+                fillcolor=color, opacity=0.12,
+                line=dict(width=0),
+                layer="below"
+            ))
+            # Give a lable to the drawn rectangle
+            if show_labels and label:
+                annotations.append(dict(
+                    x=s, y=1.02,
+                    xref="x", yref="paper",
+                    text=str(label),
+                    showarrow=False,
+                    font=dict(size=14, color=color),
+                    align="left",
+                    textangle=label_angle
+                ))
+
+    if shapes or annotations:
+        fig.update_layout(
+            shapes=list(fig.layout.shapes) + shapes,
+            annotations=list(fig.layout.annotations) + annotations
         )
 
-        # Give a lable to the drawn rectangle
-        if show_labels and row.get("label"):
-            fig.add_annotation(
-                x=s, y=1.02,
-                xref="x", yref="paper",
-                text=str(row["label"]),
-                showarrow=False,
-                font=dict(size=14, color=color),
-                align="left",
-                textangle=label_angle
-            )
+def build_plot_data(item_index: pd.DataFrame, plot_items, start, end, x_label_format: str, rolling_days: int,
+                    with_average: bool, ev_lines: pd.DataFrame, ev_spans: pd.DataFrame, selected_categories):
+    """
+    Derives everything the graph needs from the filter state: the price lines (rolled and
+    downsampled), the average area and the events to draw.
+
+    Args:
+        item_index: The item index, see load_item_index.
+        plot_items: The selected items without the average.
+        start, end: The selected date range, None for everything.
+        x_label_format: The x-axes description.
+        rolling_days: The rolling median window, 0 is off.
+        with_average: Is the average of the selected items shown.
+        ev_lines, ev_spans: All events, see load_events.
+        selected_categories: The selected event categories.
+    Returns:
+        data: Dict with plot_df, avg_df, resolution, ev_lines and ev_spans.
+    """
+    # Long ranges on a coarse x-axis are read from the weekly or monthly rollups of the store.
+    resolution = "D"
+    if plot_items and (item_index.loc[plot_items, "source"] == "store").all():
+        span_start = start if start is not None else item_index.loc[plot_items, "start"].min()
+        span_end = end if end is not None else item_index.loc[plot_items, "end"].max()
+        resolution = choose_resolution(x_label_format, span_start, span_end)
+        games = item_index.loc[plot_items, "game"].unique()
+        if any(item_fingerprint(game, "store", resolution) is None for game in games):
+            resolution = "D"  # store written before the rollups existed
+
+    price_matrix = None
+    matrix_meta = PRICE_MATRIX_DIR / META_FILE
+    if matrix_meta.exists():
+        price_matrix = load_price_matrix(matrix_meta.stat().st_mtime)
+
+    if resolution == "D" and price_matrix is not None and price_matrix.covers(plot_items):
+        # Aligned slice of the precomputed matrix, no per-item copies.
+        plot_dates, plot_values = price_matrix.select(plot_items, start, end)
+        row_keys = [(item, matrix_meta.stat().st_mtime) for item in plot_items]
+    else:
+        frames = []
+        row_keys = []
+        for item in plot_items:
+            entry = item_index.loc[item]
+            fingerprint = item_fingerprint(entry["game"], entry["source"], resolution)
+            df_item = load_item(entry["game"], entry["item"], entry["source"], fingerprint, resolution)
+            # Reduce the data given by a timeframe (if filtered), rollups keep the period holding the start.
+            if start is not None:
+                first = start if resolution == "D" else period_start(pd.Series([start]), resolution).iloc[0]
+                df_item = df_item[(df_item["timestamp"] >= first) & (df_item["timestamp"] <= end)]
+
+            # Reduce the colums to only needed ones.
+            df_item = df_item[["timestamp", "price_median"]].rename(columns={"price_median": "price"})
+            df_item["item"] = item
+            frames.append(df_item)
+            # Same version as the loaded rows, a same-day refresh of the last day is a new key.
+            row_keys.append((item, fingerprint, resolution))
+        # Align the items on one date axis.
+        if frames:
+            aligned = pd.concat(frames).pivot(index="item", columns="timestamp", values="price").reindex(plot_items)
+        else:
+            aligned = pd.DataFrame(index=plot_items, columns=pd.DatetimeIndex([]), dtype="float64")
+        plot_dates, plot_values = aligned.columns, aligned.to_numpy(dtype="float64")
+
+    # Rolling (optional), one pass over all selected items, cached per item and window.
+    axis = (plot_dates[0], plot_dates[-1], len(plot_dates)) if len(plot_dates) else None
+    window = days_to_periods(rolling_days, resolution)
+    rolled_values = rolling_cache().get(row_keys, plot_values, window, context=axis)
+    rolled_values = mask_outside_range(rolled_values, plot_values)
+    plot_df = to_long(plot_items, plot_dates, rolled_values, valid=plot_values)
+    plot_df = plot_df.sort_values(["item", "timestamp"])
+
+    # Only send as many points per series as the x-axis description can show.
+    max_points = None
+    if not plot_df.empty:
+        max_points = max_points_for(x_label_format, plot_df["timestamp"].min(), plot_df["timestamp"].max())
+
+    avg_df = None
+    if with_average and not plot_df.empty:
+        avg_df = pd.DataFrame({"timestamp": plot_dates, "price": nan_mean(rolled_values)}).dropna(subset=["price"])
+        avg_df = downsample_long(avg_df, max_points, by=None)
+
+    lines, spans = filter_events(ev_lines, ev_spans, selected_categories,
+                                 x_range=(start, end) if start is not None else None)
+    return {
+        "plot_df": downsample_long(plot_df, max_points),
+        "avg_df": avg_df,
+        "resolution": resolution,
+        "ev_lines": lines,
+        "ev_spans": spans,
+    }
             
 
 # Load the data.
-ev_lines, ev_spans = load_events(EVENTS_CSV)
-dfs = load_histories()
+# Every rerun compares the file fingerprints, only changed files are read again.
+with page_metrics.timer("load_data"):
+    events_version = file_fingerprint(EVENTS_CSV)
+    sources_version = sources_fingerprint()
+    ev_lines, ev_spans = load_events(EVENTS_CSV, events_version)
+    item_index = load_item_index(sources_version)
 special_item = "Average (selected items)"
-items = [special_item] + sorted(dfs.keys())
+items = [special_item] + sorted(item_index.index)
 
-ev_lines_filtered = ev_lines.copy()
-ev_spans_filtered = ev_spans.copy()
 
 
 st.title("Homepage For Analyzing Virtual Item Markets")
 
-racoon = Image.open(TEXTS_AND_PICTURE_DIR / "images.png")
-
-
-with open(TEXTS_AND_PICTURE_DIR / "text1.md", "r", encoding="utf-8") as f:
-    text1 = f.read()
-with open(TEXTS_AND_PICTURE_DIR / "text2.md", "r", encoding="utf-8") as f:
-    text2 = f.read()
-with open(TEXTS_AND_PICTURE_DIR / "text3.md", "r", encoding="utf-8") as f:
-    text3 = f.read()
-with open(TEXTS_AND_PICTURE_DIR / "text4.md", "r", encoding="utf-8") as f:
-    text4 = f.read()
+# Static content, read again only when a file changes.
+with page_metrics.timer("static_assets"):
+    racoon = load_image(file_fingerprint(TEXTS_AND_PICTURE_DIR / "images.png"))
+    text1, text2, text3, text4 = (
+        load_text(file_fingerprint(TEXTS_AND_PICTURE_DIR / f"text{i}.md")) for i in range(1, 5)
+    )
 
 
     
@@ -280,30 +582,23 @@ fmt_map = {
 }
 
 # Prepare the plot data.
-frames = []
-for item in sel_items:
-    if item == special_item:
-        continue
-    df_item = dfs[item].copy()
-    # Reduce the data given by a timeframe (if filtered).
-    if date_range and len(date_range) == 2:
-        start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-        df_item = df_item[(df_item["timestamp"] >= start) & (df_item["timestamp"] <= end)]
-        
-        # Filter line events
-        ev_lines_filtered = ev_lines_filtered[
-            (ev_lines_filtered["date"] >= start) & (ev_lines_filtered["date"] <= end)
-        ]
-
-        # Filter span events
-        ev_spans_filtered = ev_spans_filtered[
-            (ev_spans_filtered["end"] >= start) & (ev_spans_filtered["start"] <= end)
-        ]
-    
-    # Reduce the colums to only needed ones.
-    df_item = df_item[["timestamp", "price_median"]].rename(columns={"price_median": "price"})
-    df_item["item"] = item
-    frames.append(df_item)
+plot_items = [item for item in sel_items if item != special_item]
+start = end = None
+if plot_items and date_range and len(date_range) == 2:
+    start, end = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+
+# Identical views of any session are served from the shared cache.
+matrix_meta = PRICE_MATRIX_DIR / META_FILE
+plot_key = (
+    tuple(plot_items), start, end, x_label_format, st.session_state["rolling"], special_item in sel_items,
+    tuple(sorted(sel_cats)),
+    (events_version, sources_version, matrix_meta.stat().st_mtime if matrix_meta.exists() else None),
+)
+with page_metrics.timer("plot_data"):
+    plot_data = plot_data_cache().get_or_compute(plot_key, lambda: build_plot_data(
+        item_index, plot_items, start, end, x_label_format, st.session_state["rolling"],
+        special_item in sel_items, ev_lines, ev_spans, sel_cats))
+plot_df, avg_df, resolution = plot_data["plot_df"], plot_data["avg_df"], plot_data["resolution"]
 
 st.write("#### Event Legend")
 legend_cols = st.columns(len(sel_cats) if sel_cats else 1)
@@ -320,15 +615,9 @@ for i, cat in enumerate(sel_cats):
         )
 
 # Build the graph. 
-if frames:
-    plot_df = pd.concat(frames, ignore_index=True).sort_values(["item", "timestamp"])
-
-    # Rolling (optional)
-    if st.session_state["rolling"] > 0:
-        plot_df["price"] = (
-            plot_df.groupby("item", group_keys=False)["price"]
-                   .apply(lambda s: s.rolling(st.session_state["rolling"], min_periods=1).median())
-        )
+if plot_items:
+    graph_started = time.perf_counter()
+    import plotly.express as px
 
     fig = px.line(
         plot_df,
@@ -338,10 +627,7 @@ if frames:
         labels={"timestamp": "Date", "price": "Price (Median)"},
     )
     
-    if (special_item in sel_items) and (not plot_df.empty):
-        avg_df = plot_df.groupby("timestamp", as_index=False)["price"].mean()
-        
-        
+    if avg_df is not None:
         fig.add_traces(px.area(
             avg_df,
             x="timestamp",
@@ -373,7 +659,11 @@ if frames:
             # clamp to data range
             fig.update_xaxes(range=[start, max_ts], autorange=False)
         
-    add_events_to_figure(fig, ev_lines_filtered, ev_spans_filtered, sel_cats)
+    add_events_to_figure(fig, plot_data["ev_lines"], plot_data["ev_spans"])
+    page_metrics.add_time("figure", time.perf_counter() - graph_started)
+    if resolution != "D":
+        st.caption(f"{'Weekly' if resolution == 'W' else 'Monthly'} medians are shown for this range, "
+                   f"choose Weeks or Days for daily prices.")
     st.plotly_chart(
         fig,
         use_container_width=True,
@@ -387,3 +677,57 @@ if frames:
 else:
     st.info("Please select at least one item.")
 
+
+# Compare the markets of the games (price store only).
+if (item_index["source"] == "store").any():
+    st.write("#### Market Comparison")
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        index_base = st.date_input("Base Date (=100)", value=pd.Timestamp("2022-01-01"), key="index_base")
+    with col2:
+        index_window = st.select_slider("Smoothing (Days)", options=[1, 7, 14, 30, 60], value=7, key="index_window")
+
+    with page_metrics.timer("market_index"):
+        market = load_market_comparison(pd.Timestamp(index_base), index_window, sources_version)
+    if market.empty:
+        st.info("No prices after the base date.")
+    else:
+        import plotly.graph_objects as go
+
+        index_fig = go.Figure()
+        for game, rows in market.groupby("game", sort=True):
+            color = GAME_COLORS.get(game, DEFAULT_COLOR)
+            # Band of one (smoothed) standard deviation across the items of the game.
+            index_fig.add_trace(go.Scatter(x=rows["timestamp"], y=rows["band_high"], mode="lines",
+                                           line=dict(width=0), showlegend=False, hoverinfo="skip"))
+            index_fig.add_trace(go.Scatter(x=rows["timestamp"], y=rows["band_low"], mode="lines",
+                                           line=dict(width=0), fill="tonexty", fillcolor=color, opacity=0.15,
+                                           showlegend=False, hoverinfo="skip"))
+            index_fig.add_trace(go.Scatter(x=rows["timestamp"], y=rows["smoothed"], mode="lines",
+                                           line=dict(color=color, width=3),
+                                           name=f"{game} ({int(rows['items'].max())} items)"))
+        index_fig.add_hline(y=100, line=dict(color="gray", dash="dash"))
+        index_fig.update_layout(height=500, margin=dict(l=20, r=20, t=40, b=20),
+                                yaxis_title=f"Normalized Price Index ({pd.Timestamp(index_base):%d.%m.%Y} = 100)",
+                                xaxis_title="Date")
+        index_fig.update_xaxes(tickformat=fmt_map[x_label_format])
+        st.plotly_chart(index_fig, use_container_width=True)
+
+
+# Timing report of the first run and the reruns of this process.
+history = timing_history()
+total = time.perf_counter() - RUN_STARTED
+if history["first"] is None:
+    history["first"] = total
+else:
+    history["reruns"].append(total)
+with st.expander("Page Timings"):
+    stages = page_metrics.summary()["stages"]
+    st.dataframe(pd.DataFrame(
+        [{"stage": name, "ms": round(stage["seconds"] * 1000, 1)} for name, stage in stages.items()]
+        + [{"stage": "total", "ms": round(total * 1000, 1)}]
+    ), hide_index=True)
+    reruns = list(history["reruns"])
+    st.caption(f"First run: {history['first'] * 1000:.0f} ms, "
+               + (f"median rerun: {pd.Series(reruns).median() * 1000:.0f} ms over {len(reruns)} reruns"
+                  if reruns else "no reruns yet"))
@@ -1,12 +1,27 @@
+import argparse
+import json
 import os
 import re
 import time
+import threading
 import urllib.parse
+import zlib
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+
+from aggregation import aggregate_daily
+from crawl_manifest import CrawlManifest
+from fetch_metrics import METRICS
+from price_matrix import build_price_matrix
+from price_store import compact_prices, read_item_index, read_prices, stage_prices, write_prices
+from raw_archive import ARCHIVE_DIR, compact_points, read_points, stage_points, write_points
+from response_cache import ResponseCache
 
 # -----------------
 # CONFIG
@@ -17,14 +32,52 @@ APPID_DOTA = 570
 APPID_TF2 = 440
 CURRENCY = 3 # 1=USD, 2=GBP, 3=EUR
 COUNTRY = "DE"
+STEAM_MARKET_BASE = os.getenv("STEAM_MARKET_BASE", "https://steamcommunity.com").rstrip("/")
 REQUESTS_PER_MINUTE = 20
 MAX_RETRIES = 3
 RETRY_BACKOFF = 2.0
+MAX_WORKERS = 4  # concurrent requests in flight, the rate is still capped by REQUESTS_PER_MINUTE
+
+# Adaptive rate control (AIMD), REQUESTS_PER_MINUTE is the starting rate
+RATE_MIN_PER_MINUTE = 2.0
+RATE_MAX_PER_MINUTE = 60.0
+RATE_INCREASE = 1.0  # requests per minute added after RATE_SUCCESS_WINDOW successes in a row
+RATE_SUCCESS_WINDOW = 10
+RATE_DECREASE_FACTOR = 0.5  # the rate is multiplied with this on a 429
+RETRY_AFTER_DEFAULT = 60.0  # pause in seconds on a 429 without Retry-After header
 
 # Game prefix for CSV filenames
 GAME_PREFIX_CS = "CS_"
 GAME_PREFIX_DOTA = "Dota_"
 GAME_PREFIX_TF2 = "TF2_"
+GAME_PREFIXES = {APPID_CS: GAME_PREFIX_CS, APPID_DOTA: GAME_PREFIX_DOTA, APPID_TF2: GAME_PREFIX_TF2}
+
+# Directory of the per-item history CSV files
+CSV_DIR = "data"
+
+# Game labels for the price store partitions
+GAME_NAMES = {APPID_CS: "CS", APPID_DOTA: "Dota", APPID_TF2: "TF2"}
+PRICE_STORE_DIR = os.path.join("data", "price_store")
+STORE_FLUSH_EVERY = 25  # items written to the store (and marked done) per batch
+PRICE_MATRIX_DIR = os.path.join("data", "price_matrix")  # memory-mapped median matrix for the dashboard
+
+# Crawl manifest
+MANIFEST_PATH = os.path.join("data", "crawl_manifest.sqlite")
+FRESH_HOURS = 12.0  # items fetched within this time are skipped
+ITEM_MAX_ATTEMPTS = 3  # failed attempts per item before it is left for the next run
+
+# Raw response cache
+CACHE_DIR = os.path.join("data", "http_cache")
+
+# Run summary (JSON and Prometheus text format)
+METRICS_JSON = os.path.join("data", "fetch_metrics.json")
+METRICS_PROM = os.path.join("data", "fetch_metrics.prom")
+
+# Sharded crawls, every shard writes its own store, manifest and metrics below this directory
+SHARD_DIR = os.path.join("data", "shards")
+
+# Crawls in another currency than CURRENCY write everything below data/currency_<id>
+CURRENCY_DIR = os.path.join("data", "currency_{currency}")
 
 #ITEMS no prefix (CS only)
 ITEMS = [
@@ -180,6 +233,132 @@ def rate_limit_sleep() -> None:
     """
     delay = max(60.0 / float(REQUESTS_PER_MINUTE), 0.05)
     time.sleep(delay)
+    METRICS.add_time("rate_limit_wait", delay)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that spreads requests evenly over time.
+    One bucket is shared by all fetch workers so the total request rate
+    stays below REQUESTS_PER_MINUTE no matter how many requests are in flight.
+    Args:
+        rate_per_minute: How many tokens are refilled per minute
+        capacity: How many tokens can be saved up for a burst
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int = 1):
+        self.rate = max(float(rate_per_minute), 0.01) / 60.0
+        self.capacity = max(int(capacity), 1)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until a token is available and take it.
+        Returns:
+            float: the seconds spent waiting for the token
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return waited
+                    delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    @property
+    def rate_per_minute(self) -> float:
+        return self.rate * 60.0
+
+    def on_success(self) -> None:
+        """
+        Called after a successful request, a fixed bucket ignores it.
+        """
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Called after a 429 response, a fixed bucket ignores it.
+        """
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate follows what the server allows (AIMD).
+    After RATE_SUCCESS_WINDOW successes in a row the rate grows by RATE_INCREASE per minute.
+    A 429 multiplies it with RATE_DECREASE_FACTOR and pauses all workers for Retry-After seconds.
+    Args:
+        rate_per_minute: The starting rate
+        min_rate: The lowest rate per minute
+        max_rate: The highest rate per minute
+    """
+
+    def __init__(self, rate_per_minute: float, min_rate: float = RATE_MIN_PER_MINUTE, max_rate: float = RATE_MAX_PER_MINUTE):
+        super().__init__(rate_per_minute)
+        self.min_rate = min_rate / 60.0
+        self.max_rate = max_rate / 60.0
+        self._successes = 0
+        self._last_decrease = float("-inf")
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self._successes >= RATE_SUCCESS_WINDOW:
+                self._successes = 0
+                self.rate = min(self.rate + RATE_INCREASE / 60.0, self.max_rate)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        pause = RETRY_AFTER_DEFAULT if retry_after is None else max(retry_after, 0.0)
+        with self._lock:
+            now = time.monotonic()
+            self._successes = 0
+            self._paused_until = max(self._paused_until, now + pause)
+            # Requests that were already in flight report the same throttle, only react once per interval.
+            if now - self._last_decrease >= max(pause, 1.0 / self.rate):
+                self._last_decrease = now
+                self.rate = max(self.rate * RATE_DECREASE_FACTOR, self.min_rate)
+            self._tokens = 0.0
+            self._last = now + pause
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, either seconds or an HTTP date.
+    Args:
+        value: The header value
+    Returns:
+        float: the seconds to wait, None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """
+    Create a session whose connection pool is big enough for all workers.
+    Args:
+        pool_size: Number of connections kept open per host
+    Returns:
+        requests.Session: the pooled session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 def market_hash_quote(name: str) -> str:
     """
@@ -214,12 +393,41 @@ def parse_history_timestamp(ts: str) -> Optional[datetime]:
             continue
     return None
 
-def steam_get(url: str, session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+MONTH_NUMBERS = {m: f"{i:02d}" for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+def parse_history_timestamps(raw: pd.Series) -> pd.Series:
+    """
+    Parse a whole column of Steam history timestamps at once.
+    The regular "Mon DD YYYY HH: +0" strings are rewritten in bulk to "YYYY-MM-DD HH" and
+    converted with one pd.to_datetime call, only the rare rows that don't match fall back
+    to parse_history_timestamp.
+    Args:
+        raw: The raw timestamps
+    Returns:
+        pd.Series: the parsed timestamps, NaT where parsing failed
+    """
+    s = raw.astype("string")
+    regular = s.str.fullmatch(r"[A-Z][a-z]{2} \d{2} \d{4} \d{2}: \+0").fillna(False).astype(bool)
+    iso = (
+        s.str.slice(7, 11) + "-" + s.str.slice(0, 3).map(MONTH_NUMBERS) + "-"
+        + s.str.slice(4, 6) + " " + s.str.slice(12, 14)
+    )
+    parsed = pd.to_datetime(iso.where(regular), format="%Y-%m-%d %H", errors="coerce")
+    misses = ~regular & raw.notna()
+    if misses.any():
+        parsed[misses] = pd.to_datetime(raw[misses].map(parse_history_timestamp))
+    return parsed
+
+def steam_get(url: str, session: Optional[requests.Session] = None, limiter: Optional[TokenBucket] = None, **kwargs) -> requests.Response:
     """
     Sets headers and the Cookie for the pricehistory api and then request it.
     Args:
         url: The url with the hashname
         session: Optional session for connection pooling
+        limiter: Optional shared token bucket, a token is taken before every request.
+            Without it the fixed rate_limit_sleep() runs after every success.
+            An AdaptiveRateLimiter also handles the wait after a 429 (Retry-After).
         **kwargs: Possibility to add more parameters to the request
     Returns:
         requests.response: the request if it was successful
@@ -243,16 +451,29 @@ def steam_get(url: str, session: Optional[requests.Session] = None, **kwargs) ->
     last_exc: Optional[Exception] = None
     while attempt < MAX_RETRIES:
         try:
-            resp = sess.get(url, headers=headers, cookies=cookies, timeout=30, **kwargs)
+            if limiter is not None:
+                METRICS.add_time("rate_limit_wait", limiter.acquire())
+            with METRICS.timer("request"):
+                resp = sess.get(url, headers=headers, cookies=cookies, timeout=30, **kwargs)
+            METRICS.inc("responses", resp.status_code)
+            if resp.status_code == 429 and limiter is not None:
+                limiter.on_throttle(parse_retry_after(resp.headers.get("Retry-After")))
             if resp.status_code in (400, 403, 429, 502, 503):
                 raise requests.HTTPError(f"{resp.status_code} for {url}", response=resp)
             resp.raise_for_status()
-            rate_limit_sleep()
+            if limiter is None:
+                rate_limit_sleep()
+            else:
+                limiter.on_success()
             return resp
         except Exception as e:
             last_exc = e
             attempt += 1
-            time.sleep(RETRY_BACKOFF ** attempt)
+            status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else None
+            METRICS.inc("retries", status or type(e).__name__)
+            if not (status == 429 and isinstance(limiter, AdaptiveRateLimiter)):
+                time.sleep(RETRY_BACKOFF ** attempt)
+                METRICS.add_time("retry_sleep", RETRY_BACKOFF ** attempt)
     raise RuntimeError(f"Steam GET failed: {last_exc}")
 
 def build_pricehistory_urls(appid: int, currency: int, country: str, item_name: str) -> List[str]:
@@ -269,7 +490,7 @@ def build_pricehistory_urls(appid: int, currency: int, country: str, item_name:
 
     """
     qname = market_hash_quote(item_name)
-    base = f"https://steamcommunity.com/market/pricehistory/?appid={appid}&market_hash_name={qname}"
+    base = f"{STEAM_MARKET_BASE}/market/pricehistory/?appid={appid}&market_hash_name={qname}"
     return [
       base + f"&country={country}&currency={currency}",
       base + f"&currency={currency}",
@@ -279,8 +500,26 @@ def build_pricehistory_urls(appid: int, currency: int, country: str, item_name:
 # -----------------
 # Fetch functions
 # -----------------
+# Index of the build_pricehistory_urls variant that last worked per appid, it is tried first.
+WORKING_URL_VARIANT: Dict[int, int] = {}
 
-def fetch_pricehistory(appid: int, currency: int, country: str, item_name: str, session: Optional[requests.Session] = None) -> pd.DataFrame:
+def parse_price_points(data: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Turn the "prices" of a pricehistory response into raw points.
+    Args:
+        data: The decoded JSON response
+    Returns:
+        pd.DataFrame: timestamp, price and volume per point, invalid rows are dropped
+    """
+    rows = data.get("prices", [])
+    df = pd.DataFrame(rows, columns=["timestamp_raw", "price", "volume"])
+    df["timestamp"] = parse_history_timestamps(df["timestamp_raw"])
+    df = df.dropna(subset=["timestamp"]).copy()
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    df["volume"] = pd.to_numeric(df["volume"], errors="coerce")
+    return df.dropna(subset=["price", "volume"])[["timestamp", "price", "volume"]]
+
+def fetch_pricehistory(appid: int, currency: int, country: str, item_name: str, session: Optional[requests.Session] = None, limiter: Optional[TokenBucket] = None, since: Optional[datetime] = None, cache: Optional[ResponseCache] = None, with_points: bool = False) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
     """
     Fetch and transform the requested data per item from a JSON into a dataframe.
 
@@ -290,6 +529,12 @@ def fetch_pricehistory(appid: int, currency: int, country: str, item_name: str,
         country: The country you want to request
         item_name: The specific hash name from the item you want to request
         session: Optional session for re-use
+        limiter: Optional shared token bucket for the request rate
+        since: Optional last stored timestamp, only points from that day on are aggregated.
+            The day itself is kept so a partial last day gets recomputed.
+        cache: Optional response cache, in offline mode only cached responses are used
+        with_points: Also return all raw points (timestamp, price, volume) of the response,
+            since does not cut them, so the raw archive always gets the complete history
 
     Returns:
         pd.DataFrame: data with the columns:
@@ -297,90 +542,697 @@ def fetch_pricehistory(appid: int, currency: int, country: str, item_name: str,
             - price_mean (float)
             - price_median (float)
             - volume_sum (float)
+        With with_points a tuple (daily data, raw points).
 
     Raises:
         RuntimeError: If no attempt is successful
 
     """
     last_err: Optional[Exception] = None
-    for url in build_pricehistory_urls(appid, currency, country, item_name):
+    urls = build_pricehistory_urls(appid, currency, country, item_name)
+    order = list(range(len(urls)))
+    known = WORKING_URL_VARIANT.get(appid)
+    if known is not None and known < len(urls):
+        order.remove(known)
+        order.insert(0, known)
+    for variant in order:
+        url = urls[variant]
         try:
-            headers = {"Referer": f"https://steamcommunity.com/market/listings/{appid}/{market_hash_quote(item_name)}"}
-            resp = steam_get(url, session=session, headers=headers)
-            data = resp.json()
+            headers = {"Referer": f"{STEAM_MARKET_BASE}/market/listings/{appid}/{market_hash_quote(item_name)}"}
+            body = cache.get(url) if cache is not None else None
+            if cache is not None:
+                METRICS.inc("cache", "miss" if body is None else "hit")
+            from_network = body is None
+            if from_network:
+                if cache is not None and cache.offline:
+                    raise RuntimeError(f"No cached response for {url} (offline mode)")
+                body = steam_get(url, session=session, limiter=limiter, headers=headers).content
+            METRICS.add_response_size(len(body))
+            with METRICS.timer("json_parse"):
+                data = json.loads(body)
+            if from_network and cache is not None and data.get("success"):
+                cache.put(url, body)
             if not data.get("success"):
+                METRICS.inc("unsuccessful", variant)
                 continue
-            rows = data.get("prices", [])
-            df = pd.DataFrame(rows, columns=["timestamp_raw", "price", "volume"])
-            df["timestamp"] = pd.to_datetime(df["timestamp_raw"].apply(parse_history_timestamp))
-            df = df.dropna(subset=["timestamp"]).copy()
-            df["price"] = pd.to_numeric(df["price"], errors="coerce")
-            df["volume"] = pd.to_numeric(df["volume"], errors="coerce")
-            df = df.dropna(subset=["price", "volume"]).copy()
+            with METRICS.timer("parse_points"):
+                df = parse_price_points(data)
             if df.empty:
                 continue
+            points = df
+            if since is not None:
+                df = df[df["timestamp"] >= pd.Timestamp(since).normalize()]
             # Aggregate daily
-            df = df.set_index("timestamp").sort_index()
-            daily = df.resample("D").agg(
-                price_mean=("price", "mean"),
-                price_median=("price", "median"),
-                volume_sum=("volume", "sum")
-            ).reset_index()
-            return daily
+            with METRICS.timer("resample"):
+                daily = df.set_index("timestamp").sort_index().resample("D").agg(
+                    price_mean=("price", "mean"),
+                    price_median=("price", "median"),
+                    volume_sum=("volume", "sum")
+                ).reset_index()
+            WORKING_URL_VARIANT[appid] = variant
+            return (daily, points) if with_points else daily
         except Exception as e:
             last_err = e
             continue
     raise RuntimeError(f"Failed to fetch price history for '{item_name}'. Last error: {last_err}")
 
+def history_csv_path(item: str, prefix: str = "", out_dir: str = "data") -> str:
+    """
+    Build the CSV path for an item.
+    Args:
+        item: The hash name of the item
+        prefix: The game prefix for the filename
+        out_dir: The directory of the CSV files
+    Returns:
+        str: the path of the CSV file
+    """
+    safe_name = item.replace(" ", "_").replace("|", "").replace("/", "-")
+    return os.path.join(out_dir, f"{prefix}{safe_name}_history.csv")
+
+def read_last_timestamp(csv_path: str, chunk_size: int = 4096) -> Optional[pd.Timestamp]:
+    """
+    Read the timestamp of the last row of a history CSV without parsing the whole file.
+    Args:
+        csv_path: The path of the CSV file
+        chunk_size: How many bytes are read from the end of the file
+    Returns:
+        pd.Timestamp: the last stored timestamp, None if the file is missing or empty
+    """
+    if not os.path.exists(csv_path):
+        return None
+    with open(csv_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(size - chunk_size, 0))
+        lines = f.read().decode("utf-8", errors="ignore").splitlines()
+    for line in reversed(lines):
+        ts = pd.to_datetime(line.split(",", 1)[0], errors="coerce")
+        if not pd.isna(ts):
+            return ts
+    return None
+
+def append_history(df: pd.DataFrame, csv_path: str, chunk_size: int = 4096) -> None:
+    """
+    Append new daily rows to an existing history CSV.
+    Stored rows from the first new day on are replaced, older rows are not touched.
+    Args:
+        df: The new daily rows
+        csv_path: The path of the CSV file
+        chunk_size: How many bytes at the end of the file are searched for the first replaced row
+    """
+    if df.empty:
+        return
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        df.to_csv(csv_path, index=False, encoding="utf-8")
+        return
+
+    first_new = pd.Timestamp(df["timestamp"].min())
+    with open(csv_path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        start = max(f.tell() - chunk_size, 0)
+        f.seek(start)
+        tail = f.read()
+        lines = tail.splitlines(keepends=True)
+        offsets = [start]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
+        if start > 0:
+            lines, offsets = lines[1:], offsets[1:]  # the first line may be cut off
+
+        # Walk backwards until a row older than the new data (or the header) shows up.
+        cut = None
+        for i in range(len(lines) - 1, -1, -1):
+            field = lines[i].decode("utf-8", errors="ignore").split(",", 1)[0].strip()
+            ts = pd.to_datetime(field, errors="coerce") if field else pd.NaT
+            if pd.isna(ts) and not field:
+                continue
+            if pd.isna(ts) or ts < first_new:
+                cut = offsets[i + 1]
+                break
+        if cut is not None:
+            f.seek(cut)
+            f.truncate()
+            if not lines[i].endswith(b"\n"):
+                f.write(b"\n")
+            f.write(df.to_csv(index=False, header=False).encode("utf-8"))
+            return
+
+    # The new data reaches further back than the tail, merge the whole file instead.
+    old = pd.read_csv(csv_path, parse_dates=["timestamp"])
+    old = old[old["timestamp"] < first_new]
+    pd.concat([old, df], ignore_index=True).to_csv(csv_path, index=False, encoding="utf-8")
+
+def read_item_list(path: str) -> List[str]:
+    """
+    Read an item list file: one market hash name per line.
+    Blank lines and lines starting with # are skipped, duplicates are dropped.
+    Args:
+        path: The path of the text file
+    Returns:
+        list: the item names in file order
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        names = [line.strip() for line in f]
+    return list(dict.fromkeys(name for name in names if name and not name.startswith("#")))
+
+def resolve_game(game: str) -> Tuple[int, str]:
+    """
+    Look up the appid and the CSV prefix of a game.
+    Args:
+        game: A game label of GAME_NAMES (CS, Dota, TF2, any case) or a numeric appid
+    Returns:
+        tuple: (appid, CSV file prefix)
+    Raises:
+        ValueError: If the game is neither a known label nor an appid
+    """
+    appids = {label.lower(): appid for appid, label in GAME_NAMES.items()}
+    key = str(game).strip()
+    if key.isdigit():
+        appid = int(key)
+    elif key.lower() in appids:
+        appid = appids[key.lower()]
+    else:
+        raise ValueError(f"Unknown game: {game}, use one of {sorted(GAME_NAMES.values())} or an appid")
+    return appid, GAME_PREFIXES.get(appid, f"{GAME_NAMES.get(appid, appid)}_")
+
+def incremental_since(jobs: List[Tuple[int, str, str]], store_dir: Optional[str] = None, csv_dir: str = CSV_DIR) -> Dict[Tuple[int, str, str], pd.Timestamp]:
+    """
+    Find the timestamp every job can be refreshed from in incremental mode.
+    It is the last day that the CSV file and the price store both hold, so neither gets a gap.
+    Items that are missing from one of them are fetched in full.
+    Args:
+        jobs: (appid, game prefix, item name) tuples
+        store_dir: Directory of the parquet price store, None if only CSV files are written
+        csv_dir: Directory of the history CSV files
+    Returns:
+        dict: job -> last timestamp, only for jobs that can be refreshed incrementally
+    """
+    store_ends = {}
+    if store_dir:
+        index = read_item_index(store_dir)
+        store_ends = dict(zip(zip(index["game"].astype(str), index["item"]), pd.to_datetime(index["end"])))
+    since = {}
+    for job in jobs:
+        appid, prefix, item = job
+        last_ts = read_last_timestamp(history_csv_path(item, prefix, csv_dir))
+        if last_ts is not None and store_dir:
+            store_end = store_ends.get((GAME_NAMES.get(appid, str(appid)), item))
+            last_ts = None if store_end is None else min(last_ts, store_end)
+        if last_ts is not None:
+            since[job] = last_ts
+    return since
+
+def item_jobs(item_lists: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[int, str, str]]:
+    """
+    Collect all items to crawl.
+    Args:
+        item_lists: Optional (game, file path) pairs, see resolve_game and read_item_list.
+            Without them the lists ITEMS, ITEMS_CS, ITEMS_DOTA and ITEMS_TF2 are used
+    Returns:
+        list: (appid, game prefix, item name) for every item, without duplicates
+    """
+    if item_lists is None:
+        groups = [
+            (APPID_DEFAULT, "", ITEMS),
+            (APPID_CS, GAME_PREFIX_CS, ITEMS_CS),
+            (APPID_DOTA, GAME_PREFIX_DOTA, ITEMS_DOTA),
+            (APPID_TF2, GAME_PREFIX_TF2, ITEMS_TF2),
+        ]
+    else:
+        groups = [(*resolve_game(game), read_item_list(path)) for game, path in item_lists]
+    return list(dict.fromkeys((appid, prefix, item) for appid, prefix, items in groups for item in items))
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard given as "i/n" (0 <= i < n).
+    Args:
+        value: The shard, e.g. "0/4"
+    Returns:
+        tuple: (index, count)
+    Raises:
+        ValueError: If the value is not a valid shard
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", value)
+    if not match or not int(match.group(1)) < int(match.group(2)):
+        raise ValueError(f"Invalid shard: {value}, expected i/n with 0 <= i < n")
+    return int(match.group(1)), int(match.group(2))
+
+def shard_of(job: Tuple[int, str, str], count: int) -> int:
+    """
+    The shard of a job, a stable hash of appid and item name.
+    It is the same in every process and on every machine, and an item keeps its shard
+    when other items are added to or removed from the lists.
+    """
+    appid, _, item = job
+    return zlib.crc32(f"{appid}|{item}".encode("utf-8")) % count
+
+def shard_jobs(jobs: List[Tuple[int, str, str]], index: int, count: int) -> List[Tuple[int, str, str]]:
+    """
+    The disjoint slice of jobs that belongs to one shard, all shards together cover every job.
+    Args:
+        jobs: (appid, game prefix, item name) tuples
+        index: The shard index (0 <= index < count)
+        count: The number of shards
+    Returns:
+        list: the jobs of the shard
+    """
+    return [job for job in jobs if shard_of(job, count) == index]
+
+def shard_paths(index: int, count: int, root: str = SHARD_DIR) -> Dict[str, str]:
+    """
+    The output paths of one shard, so shards never write to the same files.
+    Args:
+        index: The shard index
+        count: The number of shards
+        root: The directory holding all shards
+    Returns:
+        dict: store_dir, manifest_path, metrics_json, metrics_prom and archive_dir of the shard
+    """
+    shard_dir = os.path.join(root, f"shard-{index}-of-{count}")
+    return {
+        "store_dir": os.path.join(shard_dir, "price_store"),
+        "manifest_path": os.path.join(shard_dir, "crawl_manifest.sqlite"),
+        "metrics_json": os.path.join(shard_dir, "fetch_metrics.json"),
+        "metrics_prom": os.path.join(shard_dir, "fetch_metrics.prom"),
+        "archive_dir": os.path.join(shard_dir, "raw_archive"),
+    }
+
+def fetch_many(jobs: List[Tuple[int, str, str]], max_workers: int = MAX_WORKERS, session: Optional[requests.Session] = None, limiter: Optional[TokenBucket] = None, since: Optional[Dict[Tuple[int, str, str], pd.Timestamp]] = None, cache: Optional[ResponseCache] = None, currency: int = CURRENCY, country: str = COUNTRY, with_points: bool = False) -> Iterator[Tuple[Tuple[int, str, str], Any, Optional[Exception]]]:
+    """
+    Fetch several items concurrently with a bounded worker pool.
+    All workers share one pooled session and one token bucket, so latency overlaps
+    while the total request rate stays within REQUESTS_PER_MINUTE.
+    A failing item does not stop the others, its error is returned instead of the data.
+    Args:
+        jobs: (appid, game prefix, item name) tuples
+        max_workers: How many requests are in flight at most
+        session: Optional shared session, a pooled one is created otherwise
+        limiter: Optional shared token bucket, one with REQUESTS_PER_MINUTE is created otherwise
+        since: Optional last stored timestamp per job for an incremental refresh
+        cache: Optional response cache shared by all workers
+        currency: Steam currency id of the prices
+        country: Country code of the requests
+        with_points: Yield (daily data, raw points) tuples instead of the daily data, see fetch_pricehistory
+    Returns:
+        Iterator: (job, dataframe, error) in the order they finish, either dataframe or error is None
+    """
+    max_workers = max(int(max_workers), 1)
+    session = session or make_session(max_workers)
+    limiter = limiter or TokenBucket(REQUESTS_PER_MINUTE)
+    since = since or {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(fetch_pricehistory, appid, currency, country, item, session, limiter, since.get((appid, prefix, item)), cache, with_points): (appid, prefix, item)
+            for appid, prefix, item in jobs
+        }
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result(), None
+            except Exception as e:
+                yield futures[fut], None, e
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def reaggregate_from_cache(jobs: List[Tuple[int, str, str]], cache: ResponseCache, processes: Optional[int] = None, currency: int = CURRENCY, country: str = COUNTRY) -> pd.DataFrame:
+    """
+    Rebuild the daily histories of many items from cached raw responses in one batch,
+    without any request.
+    Args:
+        jobs: (appid, game prefix, item name) tuples
+        cache: The response cache to read from, expired entries are used as well
+        processes: Optional number of worker processes for very large batches
+        currency: Steam currency id the responses were requested with
+        country: Country code the responses were requested with
+    Returns:
+        pd.DataFrame: game, item, timestamp, price_mean, price_median, volume_sum for every cached item
+    """
+    points = []
+    for appid, prefix, item in jobs:
+        for url in build_pricehistory_urls(appid, currency, country, item):
+            body = cache.get(url, ignore_ttl=True)
+            if body is None:
+                continue
+            data = json.loads(body)
+            if data.get("success"):
+                points.append(parse_price_points(data).assign(game=GAME_NAMES.get(appid, str(appid)), item=item))
+                break
+    if not points:
+        return pd.DataFrame(columns=["game", "item", "timestamp", "price_mean", "price_median", "volume_sum"])
+    # Grouped by game and item, the same market hash name can exist in two games.
+    return aggregate_daily(pd.concat(points, ignore_index=True), processes=processes)
+
+def currency_paths(currency: int = CURRENCY) -> Dict[str, str]:
+    """
+    The output paths of a crawl in one currency.
+    CURRENCY uses the usual paths, every other currency gets its own directory (see CURRENCY_DIR),
+    because the CSV names, the store and the manifest do not tell currencies apart.
+    Args:
+        currency: Steam currency id
+    Returns:
+        dict: csv_dir, store_dir, manifest_path, archive_dir, matrix_dir and shard_root
+    """
+    if currency == CURRENCY:
+        return {"csv_dir": CSV_DIR, "store_dir": PRICE_STORE_DIR, "manifest_path": MANIFEST_PATH,
+                "archive_dir": ARCHIVE_DIR, "matrix_dir": PRICE_MATRIX_DIR, "shard_root": SHARD_DIR}
+    root = CURRENCY_DIR.format(currency=currency)
+    return {
+        "csv_dir": root,
+        "store_dir": os.path.join(root, "price_store"),
+        "manifest_path": os.path.join(root, "crawl_manifest.sqlite"),
+        "archive_dir": os.path.join(root, "raw_archive"),
+        "matrix_dir": os.path.join(root, "price_matrix"),
+        "shard_root": os.path.join(root, "shards"),
+    }
+
 # -----------------
 # Main
 # -----------------
-def main():
+def main(max_workers: int = MAX_WORKERS, incremental: bool = False, store_dir: Optional[str] = PRICE_STORE_DIR, manifest_path: str = MANIFEST_PATH, max_age_hours: float = FRESH_HOURS, cache_dir: Optional[str] = CACHE_DIR, offline: bool = False,
+         item_lists: Optional[List[Tuple[str, str]]] = None, shard: Optional[Tuple[int, int]] = None, currency: int = CURRENCY, country: str = COUNTRY,
+         requests_per_minute: float = REQUESTS_PER_MINUTE, matrix_dir: Optional[str] = PRICE_MATRIX_DIR, metrics_json: str = METRICS_JSON, metrics_prom: str = METRICS_PROM,
+         archive_dir: Optional[str] = ARCHIVE_DIR, csv_dir: str = CSV_DIR):
     """
-    Fetch price histories for the items and write them into a CSV file.
+    Fetch price histories for the items and write them into a CSV file and the price store.
+    The crawl manifest skips items that are still fresh, so a crashed run resumes where it stopped.
+    Failed items are retried with backoff, the remaining items are fetched regardless.
+    Args:
+        max_workers: How many requests are in flight at most
+        incremental: Only append the days after the last stored timestamp to existing CSV files
+        store_dir: Directory of the parquet price store, None to only write CSV files
+        manifest_path: Path of the SQLite crawl manifest
+        max_age_hours: Hours after which a successfully fetched item is fetched again
+        cache_dir: Directory of the raw response cache, None to disable it
+        offline: Replay responses from the cache only, without any network request.
+            A replay keeps its state in a throwaway manifest, so it never marks items as fresh
+        item_lists: Optional (game, file path) pairs of item lists, see item_jobs
+        shard: Optional (index, count), only the items of this shard are fetched, see shard_jobs
+        currency: Steam currency id of the prices
+        country: Country code of the requests
+        requests_per_minute: Starting request rate of this process
+        matrix_dir: Directory of the price matrix built from the store, None to skip it (e.g. for shards)
+        metrics_json: Path of the run summary
+        metrics_prom: Path of the run summary in Prometheus text format
+        archive_dir: Directory of the raw point archive, None to only keep the daily values
+        csv_dir: Directory of the history CSV files
+    Raises:
+        ValueError: If a currency other than CURRENCY would be written to the paths of CURRENCY,
+            see currency_paths
     """
-    ensure_dir("data")
-    session = requests.Session()
+    defaults = currency_paths(CURRENCY)
+    if currency != CURRENCY and any(path == defaults[key] for key, path in (
+            ("csv_dir", csv_dir), ("store_dir", store_dir), ("manifest_path", manifest_path),
+            ("archive_dir", archive_dir), ("matrix_dir", matrix_dir))):
+        raise ValueError(f"Currency {currency} would be mixed into the histories of currency {CURRENCY}, "
+                         f"use the paths of currency_paths({currency})")
+    ensure_dir(csv_dir)
+    METRICS.reset()
+    jobs = item_jobs(item_lists)
+    if shard is not None:
+        jobs = shard_jobs(jobs, *shard)
+        print(f"[+] Shard {shard[0]}/{shard[1]}: {len(jobs)} items")
+    for path in (store_dir, manifest_path, metrics_json):
+        if path and os.path.dirname(path):
+            ensure_dir(os.path.dirname(path))
+    if store_dir:
+        # Batches a crashed run staged but never compacted, so the incremental start sees them.
+        compact_prices(store_dir)
+    if archive_dir:
+        compact_points(archive_dir)
+    # Replayed (possibly expired) responses must not make the next online run skip items.
+    manifest = CrawlManifest(":memory:" if offline else manifest_path)
+    manifest.register(jobs)
+    pending = manifest.due(jobs, max_age_hours * 3600.0)
+    print(f"[+] Fetching price history for {len(pending)} of {len(jobs)} items with {max_workers} workers")
 
-    for item in ITEMS:
+    session = make_session(max_workers)
+    limiter = AdaptiveRateLimiter(requests_per_minute)
+    cache = ResponseCache(cache_dir, offline=offline) if cache_dir else None
+    buffered = []
 
-        print(f"[+] Fetching price history for: {item}")
-        df = fetch_pricehistory(APPID_DEFAULT, CURRENCY, COUNTRY, item, session=session)
+    def flush():
+        # Items only count as done once they are staged on disk, so a crash never skips unsaved data.
+        # The staged batches are compacted into the store once at the end of the run (or the next run).
+        if store_dir and buffered:
+            with METRICS.timer("store_write"):
+                stage_prices(pd.concat([df for _, df, _ in buffered], ignore_index=True), store_dir)
+            print(f"[+] Staged {len(buffered)} items for the price store: {store_dir}")
+        if archive_dir and buffered:
+            with METRICS.timer("archive_write"):
+                stage_points(pd.concat([points for _, _, points in buffered], ignore_index=True), archive_dir)
+        manifest.mark_success([job for job, _, _ in buffered])
+        buffered.clear()
 
-        safe_name = item.replace(" ", "_").replace("|", "").replace("/", "-")
-        csv_path = os.path.join("data", f"{safe_name}_history.csv")
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-        print(f"    Saved history to: {csv_path}")
-        
-    for item in ITEMS_CS:
+    try:
+        while pending:
+            since = incremental_since(pending, store_dir, csv_dir) if incremental else {}
+            manifest.mark_running(pending)
 
-        print(f"[+] Fetching price history for: {item}")
-        df = fetch_pricehistory(APPID_CS, CURRENCY, COUNTRY, item, session=session)
+            for job, df, err in fetch_many(pending, max_workers=max_workers, session=session, limiter=limiter, since=since, cache=cache, currency=currency, country=country, with_points=bool(archive_dir)):
+                appid, prefix, item = job
+                METRICS.inc("items", "failed" if err is not None else "ok")
+                if err is not None:
+                    manifest.mark_failure(job, str(err))
+                    print(f"[!] Failed to fetch price history for: {item}: {err}")
+                    continue
+                print(f"[+] Fetched price history for: {item}")
+                df, points = df if archive_dir else (df, None)
+                game = GAME_NAMES.get(appid, str(appid))
+                if points is not None:
+                    points = points.assign(game=game, item=item)
+                csv_path = history_csv_path(item, prefix, csv_dir)
+                with METRICS.timer("csv_write"):
+                    if job in since:
+                        append_history(df, csv_path)
+                    else:
+                        df.to_csv(csv_path, index=False, encoding="utf-8")
+                print(f"    {'Appended' if job in since else 'Saved'} {len(df)} days to: {csv_path}")
+                buffered.append((job, df.assign(game=game, item=item, prefix=prefix), points))
+                if len(buffered) >= STORE_FLUSH_EVERY:
+                    flush()
+            flush()
 
-        safe_name = item.replace(" ", "_").replace("|", "").replace("/", "-")
-        csv_path = os.path.join("data", f"{GAME_PREFIX_CS}{safe_name}_history.csv")
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-        print(f"    Saved history to: {csv_path}")
+            # Retry queue: wait for the earliest backoff, then fetch everything that is due.
+            retry = [] if offline else manifest.retry_queue(ITEM_MAX_ATTEMPTS, jobs)
+            if not retry:
+                break
+            wait = max(retry[0][1] - time.time(), 0.0)
+            print(f"[+] Retrying {len(retry)} failed items in {wait:.0f}s")
+            time.sleep(wait)
+            METRICS.add_time("retry_queue_wait", wait)
+            pending = manifest.due([job for job, _ in retry], max_age_hours * 3600.0)
+    finally:
+        flush()
+        if store_dir:
+            with METRICS.timer("store_compact"):
+                rows = compact_prices(store_dir)
+            print(f"[+] Compacted {rows} staged rows into the price store: {store_dir}")
+        if archive_dir:
+            with METRICS.timer("archive_compact"):
+                compact_points(archive_dir)
+        if store_dir and matrix_dir and os.path.isdir(store_dir):
+            with METRICS.timer("matrix_build"):
+                build_price_matrix(store_dir, matrix_dir)
+        print(f"[+] Crawl manifest: {manifest.summary()}, final rate: {limiter.rate_per_minute:.1f} requests/min")
+        manifest.close()
+        METRICS.set_gauge("final_rate_per_minute", limiter.rate_per_minute)
+        METRICS.write(metrics_json, metrics_prom)
+        print(f"[+] Wrote run metrics to: {metrics_json}, {metrics_prom}")
 
-    for item in ITEMS_DOTA:
+def crawl_shard(index: int, count: int, shard_root: str = SHARD_DIR, **kwargs) -> str:
+    """
+    Crawl one shard into its own store, manifest and metrics files (see shard_paths).
+    Args:
+        index: The shard index
+        count: The number of shards
+        shard_root: The directory holding all shards
+        **kwargs: Further arguments of main
+    Returns:
+        str: the store directory of the shard, the input of merge_shards
+    """
+    paths = shard_paths(index, count, shard_root)
+    main(shard=(index, count), matrix_dir=None, **{**paths, **kwargs})
+    return paths["store_dir"]
 
-        print(f"[+] Fetching price history for: {item}")
-        df = fetch_pricehistory(APPID_DOTA, CURRENCY, COUNTRY, item, session=session)
+def crawl_processes(processes: int, store_dir: str = PRICE_STORE_DIR, matrix_dir: Optional[str] = PRICE_MATRIX_DIR,
+                    shard_root: str = SHARD_DIR, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                    archive_dir: Optional[str] = ARCHIVE_DIR, **kwargs) -> None:
+    """
+    Crawl with several local worker processes, one shard each, then merge the shards into the store.
+    The request rate is split between the processes, so together they start at requests_per_minute.
+    Args:
+        processes: The number of worker processes (and shards)
+        store_dir: The shared price store the shards are merged into
+        matrix_dir: Directory of the price matrix, None to skip it
+        shard_root: The directory holding all shards
+        requests_per_minute: Starting request rate of all processes together
+        archive_dir: The shared raw point archive the shards are merged into, None to keep no raw points
+        **kwargs: Further arguments of main, e.g. item_lists, currency or country
+    """
+    processes = max(int(processes), 1)
+    if archive_dir is None:
+        kwargs["archive_dir"] = None
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(crawl_shard, i, processes, shard_root, requests_per_minute=requests_per_minute / processes, **kwargs)
+            for i in range(processes)
+        ]
+        shard_dirs = [fut.result() for fut in futures]
+    merge_shards(shard_dirs, store_dir, matrix_dir, archive_dir)
 
-        safe_name = item.replace(" ", "_").replace("|", "").replace("/", "-")
-        csv_path = os.path.join("data", f"{GAME_PREFIX_DOTA}{safe_name}_history.csv")
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-        print(f"    Saved history to: {csv_path}")
-        
-    for item in ITEMS_TF2:
+# -----------------
+# Merge
+# -----------------
+def find_shard_stores(count: int, shard_root: str = SHARD_DIR) -> List[str]:
+    """
+    List the store directories of the shards of one crawl split into count shards.
+    Leftover shards of a split with another count are ignored, their items overlap.
+    Args:
+        count: The number of shards
+        shard_root: The directory holding all shards
+    Returns:
+        list: the store directories of the shards 0 to count - 1
+    Raises:
+        FileNotFoundError: If a shard store is missing
+    """
+    dirs = [shard_paths(index, count, shard_root)["store_dir"] for index in range(count)]
+    missing = [d for d in dirs if not os.path.isdir(d)]
+    if missing:
+        raise FileNotFoundError(f"Missing shard stores: {', '.join(missing)}")
+    return dirs
 
-        print(f"[+] Fetching price history for: {item}")
-        df = fetch_pricehistory(APPID_TF2, CURRENCY, COUNTRY, item, session=session)
+def merge_shards(shard_dirs: List[str], store_dir: str = PRICE_STORE_DIR, matrix_dir: Optional[str] = PRICE_MATRIX_DIR,
+                 archive_dir: Optional[str] = ARCHIVE_DIR) -> int:
+    """
+    Combine the stores of several shards into the shared price store.
+    The shards are upserted one game at a time, so items of the shared store that no shard
+    fetched stay untouched, and the item index, rollups and price matrix are brought up to date.
+    An item whose shard history ends before the stored one is skipped, an old shard would
+    otherwise replace the newer days.
+    Args:
+        shard_dirs: The store directories of the shards
+        store_dir: The shared price store
+        matrix_dir: Directory of the price matrix, None to skip it
+        archive_dir: The shared raw point archive, the raw archive next to every shard store
+            (see shard_paths) is merged into it. None to skip the raw points
+    Returns:
+        int: the number of merged daily rows
+    """
+    stored = read_item_index(store_dir)
+    stored_ends = dict(zip(zip(stored["game"].astype(str), stored["item"]), pd.to_datetime(stored["end"])))
+    merged = 0
+    for shard_dir in shard_dirs:
+        shard_archive = os.path.join(os.path.dirname(os.path.normpath(shard_dir)), "raw_archive")
+        for game, entries in read_item_index(shard_dir).groupby("game", sort=True):
+            ends = pd.to_datetime(entries["end"])
+            fresh = [end >= stored_ends.get((str(game), item), end) for item, end in zip(entries["item"], ends)]
+            items = list(entries["item"][fresh])
+            if len(items) < len(entries):
+                print(f"[!] Skipped {len(entries) - len(items)} {game} items of {shard_dir}, the store holds newer days")
+            if not items:
+                continue
+            prices = read_prices(shard_dir, items=items, games=[game])
+            write_prices(prices.assign(prefix=prices["item"].map(entries.set_index("item")["prefix"])), store_dir)
+            merged += len(prices)
+            print(f"[+] Merged {len(items)} {game} items from: {shard_dir}")
+            if archive_dir and os.path.isdir(shard_archive):
+                write_points(read_points(shard_archive, items=items, games=[game]), archive_dir)
+    if matrix_dir and os.path.isdir(store_dir):
+        build_price_matrix(store_dir, matrix_dir)
+    return merged
 
-        safe_name = item.replace(" ", "_").replace("|", "").replace("/", "-")
-        csv_path = os.path.join("data", f"{GAME_PREFIX_TF2}{safe_name}_history.csv")
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-        print(f"    Saved history to: {csv_path}")
+# -----------------
+# Command line
+# -----------------
+def parse_item_list_arg(value: str, default_game: str) -> Tuple[str, str]:
+    """
+    Parse an --items value "GAME=PATH" (or just "PATH" for the default game) into (game, path).
+    """
+    game, sep, path = value.partition("=")
+    if not sep:
+        return default_game, value
+    resolve_game(game)
+    return game, path
+
+def cli(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line entry point.
+    Without a command all items of the built-in lists are crawled like before.
+
+    Examples:
+        python Steam_API_pricehistory.py crawl --items CS=items/cs.txt --items Dota=items/dota.txt --shard 0/4
+        python Steam_API_pricehistory.py crawl --items CS=items/cs.txt --processes 4
+        python Steam_API_pricehistory.py merge --shards 4
+    """
+    parser = argparse.ArgumentParser(description="Crawl Steam market price histories.")
+    commands = parser.add_subparsers(dest="command")
+
+    crawl = commands.add_parser("crawl", help="fetch price histories, optionally one shard of them")
+    crawl.add_argument("--items", action="append", metavar="[GAME=]PATH",
+                       help="item list file, one market hash name per line; GAME is CS, Dota, TF2 or an appid "
+                            "(default --appid); repeat for several games, the built-in lists are used without it")
+    crawl.add_argument("--appid", default=str(APPID_DEFAULT), help="game of --items files without GAME=")
+    crawl.add_argument("--currency", type=int, default=CURRENCY, help="1=USD, 2=GBP, 3=EUR, ...")
+    crawl.add_argument("--country", default=COUNTRY)
+    crawl.add_argument("--shard", type=parse_shard, metavar="i/n",
+                       help="only crawl shard i of n (0 <= i < n) into its own store below --shard-root")
+    crawl.add_argument("--processes", type=int, default=1, help="crawl all shards with this many local processes, then merge")
+    crawl.add_argument("--shard-root", help="default: data/shards, or below the directory of a non-default currency")
+    crawl.add_argument("--workers", type=int, default=MAX_WORKERS, help="requests in flight per process")
+    crawl.add_argument("--rate", type=float, default=REQUESTS_PER_MINUTE, help="starting requests per minute")
+    crawl.add_argument("--incremental", action="store_true")
+    crawl.add_argument("--max-age-hours", type=float, default=FRESH_HOURS)
+    crawl.add_argument("--offline", action="store_true", help="replay cached responses only")
+    crawl.add_argument("--no-cache", action="store_true", help="disable the raw response cache")
+    crawl.add_argument("--store", help="the shared price store, default: see currency_paths")
+    crawl.add_argument("--archive", help="the shared raw point archive, default: see currency_paths")
+    crawl.add_argument("--no-archive", action="store_true", help="only keep the daily values")
+
+    merge = commands.add_parser("merge", help="combine shard stores into the shared price store")
+    merge.add_argument("shard_dirs", nargs="*", help="shard store directories, the --shards shards below --shard-root otherwise")
+    merge.add_argument("--shards", type=int, help="the n of the crawl (--shard i/n), required without shard_dirs")
+    merge.add_argument("--currency", type=int, default=CURRENCY, help="picks the default paths, see currency_paths")
+    merge.add_argument("--shard-root")
+    merge.add_argument("--store")
+    merge.add_argument("--archive")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        main()
+        return
+    paths = currency_paths(args.currency)
+    shard_root = args.shard_root or paths["shard_root"]
+    store_dir = args.store or paths["store_dir"]
+    if args.command == "merge":
+        if not args.shard_dirs and not args.shards:
+            parser.error("give the shard store directories or --shards n")
+        try:
+            shard_dirs = args.shard_dirs or find_shard_stores(args.shards, shard_root)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        rows = merge_shards(shard_dirs, store_dir, paths["matrix_dir"], args.archive or paths["archive_dir"])
+        print(f"[+] Merged {rows} rows from {len(shard_dirs)} shards into: {store_dir}")
+        return
+
+    try:
+        item_lists = [parse_item_list_arg(value, args.appid) for value in args.items] if args.items else None
+        resolve_game(args.appid)
+    except ValueError as e:
+        parser.error(str(e))
+    options = dict(max_workers=args.workers, incremental=args.incremental, max_age_hours=args.max_age_hours,
+                   cache_dir=None if args.no_cache else CACHE_DIR, offline=args.offline,
+                   item_lists=item_lists, currency=args.currency, country=args.country, csv_dir=paths["csv_dir"])
+    archive_dir = None if args.no_archive else args.archive or paths["archive_dir"]
+    if args.shard is not None:
+        if archive_dir is None:
+            options["archive_dir"] = None
+        crawl_shard(*args.shard, shard_root=shard_root, requests_per_minute=args.rate, **options)
+    elif args.processes > 1:
+        crawl_processes(args.processes, store_dir=store_dir, matrix_dir=paths["matrix_dir"], shard_root=shard_root,
+                        requests_per_minute=args.rate, archive_dir=archive_dir, **options)
+    else:
+        main(store_dir=store_dir, manifest_path=paths["manifest_path"], matrix_dir=paths["matrix_dir"],
+             requests_per_minute=args.rate, archive_dir=archive_dir, **options)
 
 if __name__ == "__main__":
-    main()
+    cli()
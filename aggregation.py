@@ -0,0 +1,211 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# -----------------
+# CONFIG
+# -----------------
+MIN_ROWS_PER_PROCESS = 2_000_000  # smaller batches are aggregated in the calling process
+
+DAY_NS = 86_400 * 10**9
+MONDAY_OFFSET_DAYS = 3  # 1970-01-01 was a Thursday, weeks start on the Monday before
+
+
+def bucket_index(ts: np.ndarray, resolution: str) -> np.ndarray:
+    """
+    Number the buckets of a resolution, consecutive buckets differ by 1.
+    Args:
+        ts: Timestamps as int64 nanoseconds since epoch
+        resolution: "W" (weeks from Monday), "M" (calendar months) or a fixed
+            length like "h", "6h", "D" or "2D"
+    Returns:
+        np.ndarray: int64 bucket number per timestamp
+    Raises:
+        ValueError: If the resolution is unknown
+    """
+    if resolution == "W":
+        return (ts // DAY_NS + MONDAY_OFFSET_DAYS) // 7
+    if resolution == "M":
+        return ts.astype("datetime64[ns]").astype("datetime64[M]").astype("int64")
+    return ts // _step_ns(resolution)
+
+
+def bucket_start(buckets: np.ndarray, resolution: str) -> np.ndarray:
+    """
+    The first timestamp of every bucket, the inverse of bucket_index.
+    Returns:
+        np.ndarray: datetime64[ns] per bucket
+    """
+    if resolution == "W":
+        return ((buckets * 7 - MONDAY_OFFSET_DAYS) * DAY_NS).astype("datetime64[ns]")
+    if resolution == "M":
+        return buckets.astype("datetime64[M]").astype("datetime64[ns]")
+    return (buckets * _step_ns(resolution)).astype("datetime64[ns]")
+
+
+def _step_ns(resolution: str) -> int:
+    try:
+        step = pd.Timedelta(resolution if resolution[:1].isdigit() else "1" + resolution).value
+    except ValueError:
+        step = 0
+    if step <= 0:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    return step
+
+
+def _aggregate_sorted(codes: np.ndarray, days: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+    """
+    Mean, median and volume per bucket for points sorted by (code, bucket, price).
+    Buckets without points between the first and last bucket of an item are filled like resample().
+    Returns:
+        tuple: (codes, days, price_mean, price_median, volume_sum) of the daily grid
+    """
+    n = len(codes)
+    if n == 0:
+        empty = np.empty(0)
+        return codes[:0], days[:0], empty, empty, empty
+
+    # Start of every (item, day) group
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    change[1:] = (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+    starts = np.flatnonzero(change)
+    counts = np.diff(np.append(starts, n))
+
+    g_codes = codes[starts]
+    g_days = days[starts]
+    g_mean = np.add.reduceat(prices, starts) / counts
+    g_volume = np.add.reduceat(volumes, starts)
+    # Prices are sorted inside each group, so the median sits in the middle.
+    g_median = (prices[starts + (counts - 1) // 2] + prices[starts + counts // 2]) / 2.0
+
+    # Daily grid from the first to the last day of each item
+    item_start = np.flatnonzero(np.r_[True, g_codes[1:] != g_codes[:-1]])
+    item_end = np.append(item_start[1:], len(g_codes)) - 1
+    first_day = g_days[item_start]
+    n_days = g_days[item_end] - first_day + 1
+    offsets = np.concatenate(([0], np.cumsum(n_days)[:-1]))
+    total = int(n_days.sum())
+
+    grid_codes = np.repeat(g_codes[item_start], n_days)
+    grid_days = np.repeat(first_day - offsets, n_days) + np.arange(total)
+    item_of_group = np.repeat(np.arange(len(item_start)), item_end - item_start + 1)
+    pos = offsets[item_of_group] + (g_days - first_day[item_of_group])
+
+    mean = np.full(total, np.nan)
+    median = np.full(total, np.nan)
+    volume = np.zeros(total)
+    mean[pos] = g_mean
+    median[pos] = g_median
+    volume[pos] = g_volume
+    return grid_codes, grid_days, mean, median, volume
+
+
+def _aggregate_chunk(args):
+    return _aggregate_sorted(*args)
+
+
+def aggregate_daily_batch(items, timestamps, prices, volumes, processes: Optional[int] = None,
+                          resolution: str = "D", games=None) -> pd.DataFrame:
+    """
+    Aggregate raw price points of many items to daily values in one vectorized pass.
+    The result matches fetch_pricehistory's resample("D") per item, including the empty days
+    between an item's first and last point (NaN prices, volume 0).
+    Other resolutions are aggregated the same way, see bucket_index.
+
+    Args:
+        items: Item name per point
+        timestamps: Timestamp per point
+        prices: Price per point
+        volumes: Volume per point
+        processes: Optional number of worker processes for very large batches,
+            batches below MIN_ROWS_PER_PROCESS rows per process stay in this process
+        resolution: The bucket size, "D" by default
+        games: Optional game label per point, items of different games with the same name
+            are then aggregated separately
+
+    Returns:
+        pd.DataFrame: data with the columns:
+            - game (str, only with games)
+            - item (str)
+            - timestamp (datetime, the start of the bucket)
+            - price_mean (float)
+            - price_median (float)
+            - volume_sum (float)
+    """
+    codes, names = pd.factorize(pd.Series(items), sort=True)
+    game_names = None
+    if games is not None:
+        # One code per (game, item) pair, sorted by game and item, points without a game are dropped.
+        game_codes, game_labels = pd.factorize(pd.Series(games), sort=True)
+        known = (game_codes >= 0) & (codes >= 0)
+        pairs, keys = pd.factorize(game_codes[known] * len(names) + codes[known], sort=True)
+        codes = np.full(len(codes), -1, dtype=pairs.dtype)
+        codes[known] = pairs
+        game_names = np.asarray(game_labels, dtype=object)[keys // len(names)]
+        names = np.asarray(names, dtype=object)[keys % len(names)]
+    ts = pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype="datetime64[ns]").view("int64")
+    prices = pd.to_numeric(pd.Series(prices), errors="coerce").to_numpy(dtype=float)
+    volumes = pd.to_numeric(pd.Series(volumes), errors="coerce").to_numpy(dtype=float)
+
+    valid = (codes >= 0) & (ts != np.iinfo(np.int64).min) & ~np.isnan(prices) & ~np.isnan(volumes)
+    codes, ts, prices, volumes = codes[valid], ts[valid], prices[valid], volumes[valid]
+    days = bucket_index(ts, resolution)
+
+    order = np.lexsort((prices, days, codes))
+    codes, days, prices, volumes = codes[order], days[order], prices[order], volumes[order]
+
+    workers = min(processes or 1, max(len(codes) // MIN_ROWS_PER_PROCESS, 1))
+    if workers <= 1:
+        parts = [_aggregate_sorted(codes, days, prices, volumes)]
+    else:
+        # Split on item boundaries so no item spans two chunks.
+        bounds = np.searchsorted(codes, np.linspace(0, len(names), workers + 1)[1:-1].astype(int))
+        chunks = [
+            (codes[a:b], days[a:b], prices[a:b], volumes[a:b])
+            for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(codes)])
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_aggregate_chunk, chunks))
+
+    grid_codes, grid_days, mean, median, volume = (np.concatenate(cols) for cols in zip(*parts))
+    daily = pd.DataFrame({
+        "item": np.asarray(names, dtype=object)[grid_codes],
+        "timestamp": bucket_start(grid_days, resolution),
+        "price_mean": mean,
+        "price_median": median,
+        "volume_sum": volume,
+    })
+    if game_names is not None:
+        daily.insert(0, "game", game_names[grid_codes])
+    return daily
+
+
+def aggregate_daily(points: pd.DataFrame, processes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Aggregate a long table of raw points to daily values, see aggregate_daily_batch.
+    Args:
+        points: Table with the columns item, timestamp, price, volume and optionally game
+        processes: Optional number of worker processes for very large batches
+    Returns:
+        pd.DataFrame: game (if points has it), item, timestamp, price_mean, price_median, volume_sum
+    """
+    return aggregate_daily_batch(points["item"], points["timestamp"], points["price"], points["volume"], processes=processes,
+                                 games=points["game"] if "game" in points.columns else None)
+
+
+def aggregate_points(points: pd.DataFrame, resolution: str = "D", processes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Aggregate a long table of raw points to any resolution, see aggregate_daily_batch.
+    Args:
+        points: Table with the columns item, timestamp, price, volume and optionally game
+        resolution: "h", "D", "W", "M" or another fixed length like "6h"
+        processes: Optional number of worker processes for very large batches
+    Returns:
+        pd.DataFrame: game (if points has it), item, timestamp, price_mean, price_median, volume_sum
+    """
+    return aggregate_daily_batch(points["item"], points["timestamp"], points["price"], points["volume"],
+                                 processes=processes, resolution=resolution,
+                                 games=points["game"] if "game" in points.columns else None)
@@ -0,0 +1,146 @@
+"""
+End-to-end benchmark of the fetch pipeline (steam_get -> fetch_pricehistory -> fetch_many)
+against the local mock Steam market, without touching the real endpoint.
+
+The mock server runs in its own process, so the CPU time is only the fetcher's.
+Reported: items per minute, CPU time per item, response bytes parsed, peak memory
+(resident set size in MiB, None where the resource module is missing, e.g. on Windows)
+and the status codes seen.
+
+Usage:
+    python benchmarks/bench_fetch_pipeline.py [--items 100] [--workers 4] [--rate 6000]
+        [--days 2000] [--latency 0.05] [--error-rate 0.0] [--burst-every 0] [--json out.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import Steam_API_pricehistory as fetcher
+from mock_steam_server import MockConfig, make_server
+
+
+def _peak_rss_mib():
+    # ru_maxrss is in bytes on macOS and in KiB on Linux and the BSDs.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _serve(config: MockConfig, port_queue) -> None:
+    server = make_server(config)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def run_benchmark(items: int, workers: int, rate: float, config: MockConfig, adaptive: bool = True, retry_backoff: float = 0.1) -> dict:
+    """
+    Fetch synthetic items from a mock server process and measure the client.
+    Args:
+        items: Number of items to fetch
+        workers: Concurrent requests in flight
+        rate: Starting request rate per minute
+        config: Mock server settings
+        adaptive: Use the AdaptiveRateLimiter instead of a fixed TokenBucket
+        retry_backoff: RETRY_BACKOFF used by steam_get during the run
+    Returns:
+        dict: the measured metrics
+    """
+    port_queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_serve, args=(config, port_queue), daemon=True)
+    proc.start()
+    try:
+        port = port_queue.get(timeout=10)
+        fetcher.STEAM_MARKET_BASE = f"http://127.0.0.1:{port}"
+        fetcher.RETRY_BACKOFF = retry_backoff
+        fetcher.WORKING_URL_VARIANT.clear()
+
+        lock = threading.Lock()
+        stats = {"bytes": 0}
+        statuses = Counter()
+
+        def count_response(resp, *args, **kwargs):
+            with lock:
+                stats["bytes"] += len(resp.content)
+                statuses[resp.status_code] += 1
+
+        session = fetcher.make_session(workers)
+        session.hooks["response"].append(count_response)
+        limiter = fetcher.AdaptiveRateLimiter(rate, max_rate=max(rate, fetcher.RATE_MAX_PER_MINUTE)) if adaptive else fetcher.TokenBucket(rate)
+        jobs = [(fetcher.APPID_CS, "", f"Synthetic Item {i:05d} (Field-Tested)") for i in range(items)]
+
+        rss_before = _peak_rss_mib()
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        ok = failed = rows = 0
+        for _, df, err in fetcher.fetch_many(jobs, max_workers=workers, session=session, limiter=limiter):
+            if err is None:
+                ok += 1
+                rows += len(df)
+            else:
+                failed += 1
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+        rss_after = _peak_rss_mib()
+    finally:
+        proc.terminate()
+        proc.join()
+
+    return {
+        "items": items,
+        "workers": workers,
+        "ok": ok,
+        "failed": failed,
+        "daily_rows": rows,
+        "wall_s": round(wall, 3),
+        "items_per_min": round(ok / wall * 60.0, 1) if wall else 0.0,
+        "cpu_ms_per_item": round(cpu / max(items, 1) * 1000.0, 2),
+        "bytes_parsed": stats["bytes"],
+        "peak_rss_mib": round(rss_after, 1) if rss_after is not None else None,
+        "peak_rss_growth_mib": round(rss_after - rss_before, 1) if rss_after is not None else None,
+        "final_rate_per_min": round(limiter.rate_per_minute, 1),
+        "status_codes": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=fetcher.MAX_WORKERS)
+    parser.add_argument("--rate", type=float, default=6000.0, help="starting requests per minute")
+    parser.add_argument("--fixed-rate", action="store_true", help="use a fixed TokenBucket instead of the adaptive limiter")
+    parser.add_argument("--retry-backoff", type=float, default=0.1)
+    parser.add_argument("--days", type=int, default=MockConfig.days)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--burst-every", type=int, default=MockConfig.burst_every)
+    parser.add_argument("--burst-length", type=int, default=MockConfig.burst_length)
+    parser.add_argument("--retry-after", type=float, default=MockConfig.retry_after)
+    parser.add_argument("--json", help="write the metrics to this file")
+    args = parser.parse_args()
+
+    config = MockConfig(days=args.days, latency=args.latency, error_rate=args.error_rate,
+                        burst_every=args.burst_every, burst_length=args.burst_length, retry_after=args.retry_after)
+    result = run_benchmark(args.items, args.workers, args.rate, config,
+                           adaptive=not args.fixed_rate, retry_backoff=args.retry_backoff)
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
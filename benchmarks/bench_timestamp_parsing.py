@@ -0,0 +1,67 @@
+"""
+Micro-benchmark: per-row parse_history_timestamp vs. the vectorized parse_history_timestamps.
+
+Usage:
+    python benchmarks/bench_timestamp_parsing.py [--rows 200000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Steam_API_pricehistory import parse_history_timestamp, parse_history_timestamps
+
+
+def synthetic_history(rows: int) -> pd.Series:
+    """
+    Build raw Steam timestamps for an hourly history going back from today.
+    A few rows use the rarer formats so the fallback path is exercised too.
+    Args:
+        rows: Number of timestamps
+    Returns:
+        pd.Series: the raw timestamp strings
+    """
+    hours = pd.date_range(end=pd.Timestamp.today().floor("h"), periods=rows, freq="h")
+    raw = pd.Series(hours.strftime("%b %d %Y %H: +0"))
+    raw.iloc[::1000] = hours[::1000].strftime("%Y-%m-%d %H:%M:%S")
+    return raw
+
+
+def best_of(func, repeat: int) -> float:
+    """
+    Run a function several times and return the fastest wall-clock time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = synthetic_history(args.rows)
+    old = pd.to_datetime(raw.apply(parse_history_timestamp))
+    new = parse_history_timestamps(raw)
+    if not old.equals(new):
+        raise SystemExit("vectorized parser does not match parse_history_timestamp")
+
+    t_old = best_of(lambda: pd.to_datetime(raw.apply(parse_history_timestamp)), args.repeat)
+    t_new = best_of(lambda: parse_history_timestamps(raw), args.repeat)
+    print(f"rows: {args.rows}")
+    print(f"per-row apply: {t_old:8.3f} s  ({args.rows / t_old:12,.0f} rows/s)")
+    print(f"vectorized:    {t_new:8.3f} s  ({args.rows / t_new:12,.0f} rows/s)")
+    print(f"speedup:       {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Local stand-in for the Steam market /market/pricehistory/ endpoint.
+
+Every item gets a deterministic synthetic history: one point per day for the older part
+and one point per hour for the last 30 days, in the same "Mon DD YYYY HH: +0" format Steam
+uses. Latency, random server errors and bursts of 429 responses are configurable.
+
+Usage:
+    python benchmarks/mock_steam_server.py [--port 8765] [--days 2000] [--latency 0.05]
+        [--error-rate 0.01] [--burst-every 200] [--burst-length 5] [--retry-after 1]
+
+Point the fetcher at it with STEAM_MARKET_BASE=http://127.0.0.1:8765.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class MockConfig:
+    days: int = 2000  # length of the history per item
+    hourly_days: int = 30  # the last days are sent hourly like on Steam
+    latency: float = 0.05  # seconds per response
+    error_rate: float = 0.0  # probability of a random 502/503
+    burst_every: int = 0  # every N requests a burst of 429 starts, 0 = never
+    burst_length: int = 5  # number of 429 responses per burst
+    retry_after: Optional[float] = 1.0  # Retry-After header of a 429, None to leave it out
+    seed: int = 0
+
+
+def synthetic_prices(name: str, days: int, hourly_days: int, end: Optional[float] = None) -> list:
+    """
+    Build a deterministic random-walk price history for an item.
+    Args:
+        name: The market hash name, it seeds the random walk
+        days: Length of the history in days
+        hourly_days: Number of trailing days with hourly points
+        end: Optional unix time of the last point, now otherwise
+    Returns:
+        list: [timestamp, price, volume] rows like Steam's "prices"
+    """
+    rng = random.Random(hashlib.sha256(name.encode("utf-8")).hexdigest())
+    end = int((end or time.time()) // 3600 * 3600)
+    start = end - days * 86400
+    hourly_start = end - hourly_days * 86400
+    rows = []
+    price = rng.uniform(1.0, 500.0)
+    t = start
+    while t <= end:
+        price = max(0.03, price * (1.0 + rng.gauss(0.0, 0.02)))
+        stamp = time.strftime("%b %d %Y %H: +0", time.gmtime(t))
+        rows.append([stamp, round(price, 3), str(rng.randint(1, 500))])
+        t += 3600 if t >= hourly_start else 86400
+    return rows
+
+
+class MockSteamHandler(BaseHTTPRequestHandler):
+    server_version = "MockSteam/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        cfg: MockConfig = server.config
+        with server.lock:
+            server.requests += 1
+            n = server.requests
+            rnd = server.rng.random()
+        time.sleep(cfg.latency)
+
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip("/") != "/market/pricehistory":
+            self._send(404, b"{}")
+            return
+        if cfg.burst_every and (n - 1) % cfg.burst_every < cfg.burst_length and n > cfg.burst_length:
+            headers = {} if cfg.retry_after is None else {"Retry-After": f"{cfg.retry_after:g}"}
+            with server.lock:
+                server.throttled += 1
+            self._send(429, b"{}", headers)
+            return
+        if rnd < cfg.error_rate:
+            with server.lock:
+                server.errors += 1
+            self._send(random.choice((502, 503)), b"{}")
+            return
+
+        query = parse_qs(parsed.query)
+        name = query.get("market_hash_name", [""])[0]
+        if not name:
+            self._send(400, json.dumps({"success": False}).encode("utf-8"))
+            return
+        prices = synthetic_prices(name, cfg.days, cfg.hourly_days)
+        body = json.dumps({"success": True, "price_prefix": "", "price_suffix": "€", "prices": prices}).encode("utf-8")
+        with server.lock:
+            server.bytes_sent += len(body)
+        self._send(200, body)
+
+
+def make_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Create the mock server, port 0 picks a free port.
+    """
+    server = ThreadingHTTPServer((host, port), MockSteamHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.lock = threading.Lock()
+    server.rng = random.Random(config.seed)
+    server.requests = server.errors = server.throttled = server.bytes_sent = 0
+    return server
+
+
+def start_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the mock server in a background thread.
+    Returns:
+        tuple: (server, base url), stop it with server.shutdown()
+    """
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--days", type=int, default=MockConfig.days)
+    parser.add_argument("--hourly-days", type=int, default=MockConfig.hourly_days)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate)
+    parser.add_argument("--burst-every", type=int, default=MockConfig.burst_every)
+    parser.add_argument("--burst-length", type=int, default=MockConfig.burst_length)
+    parser.add_argument("--retry-after", type=float, default=MockConfig.retry_after)
+    args = parser.parse_args()
+
+    config = MockConfig(args.days, args.hourly_days, args.latency, args.error_rate,
+                        args.burst_every, args.burst_length, args.retry_after)
+    server = make_server(config, args.host, args.port)
+    print(f"Mock Steam market on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
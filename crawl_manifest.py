@@ -0,0 +1,159 @@
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+# -----------------
+# CONFIG
+# -----------------
+RETRY_BASE_SECONDS = 30.0
+RETRY_MAX_SECONDS = 6 * 3600.0
+
+Job = Tuple[int, str, str]  # (appid, game prefix, item name)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    appid INTEGER NOT NULL,
+    prefix TEXT NOT NULL,
+    item TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    last_success REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (appid, prefix, item)
+)
+"""
+
+
+class CrawlManifest:
+    """
+    Persistent per-item crawl state in a local SQLite file.
+    Every item has a status (pending, running, done, failed), the time of its last success,
+    the number of failed attempts since then, the last error and when it may be retried.
+    A crawl that crashed simply starts again and skips everything that is still fresh.
+    Args:
+        path: Path of the SQLite file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def register(self, jobs: List[Job]) -> None:
+        """
+        Add new items to the manifest, known items keep their state.
+        Args:
+            jobs: (appid, game prefix, item name) tuples
+        """
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO items (appid, prefix, item) VALUES (?, ?, ?)", jobs
+        )
+        self.conn.commit()
+
+    def due(self, jobs: List[Job], max_age: float, now: Optional[float] = None) -> List[Job]:
+        """
+        Select the items that need to be fetched.
+        Items that succeeded within max_age seconds are skipped, failed items only after their backoff.
+        Args:
+            jobs: (appid, game prefix, item name) tuples
+            max_age: Seconds after which a successful item is fetched again
+            now: Optional current time as unix timestamp
+        Returns:
+            list: the jobs to fetch, in the given order
+        """
+        now = time.time() if now is None else now
+        state = {
+            (appid, prefix, item): (last_success, next_attempt)
+            for appid, prefix, item, last_success, next_attempt in self.conn.execute(
+                "SELECT appid, prefix, item, last_success, next_attempt FROM items"
+            )
+        }
+        result = []
+        for job in jobs:
+            last_success, next_attempt = state.get(job, (None, 0.0))
+            if last_success is not None and now - last_success < max_age:
+                continue
+            if next_attempt > now:
+                continue
+            result.append(job)
+        return result
+
+    def retry_queue(self, max_attempts: int, jobs: Optional[List[Job]] = None) -> List[Tuple[Job, float]]:
+        """
+        List the failed items that may still be retried.
+        Args:
+            max_attempts: Items with this many failed attempts are left for the next run
+            jobs: Optional (appid, game prefix, item name) tuples to limit the queue to, e.g. the jobs of this run
+        Returns:
+            list: (job, next attempt time) pairs, the earliest first
+        """
+        rows = self.conn.execute(
+            "SELECT appid, prefix, item, next_attempt FROM items "
+            "WHERE status = 'failed' AND attempts < ? ORDER BY next_attempt",
+            (max_attempts,),
+        )
+        wanted = None if jobs is None else set(jobs)
+        return [
+            ((appid, prefix, item), next_attempt) for appid, prefix, item, next_attempt in rows
+            if wanted is None or (appid, prefix, item) in wanted
+        ]
+
+    def mark_running(self, jobs: List[Job]) -> None:
+        self.conn.executemany(
+            "UPDATE items SET status = 'running' WHERE appid = ? AND prefix = ? AND item = ?", jobs
+        )
+        self.conn.commit()
+
+    def mark_success(self, jobs: List[Job], now: Optional[float] = None) -> None:
+        """
+        Record that items were fetched and saved.
+        Args:
+            jobs: (appid, game prefix, item name) tuples
+            now: Optional current time as unix timestamp
+        """
+        now = time.time() if now is None else now
+        self.conn.executemany(
+            "UPDATE items SET status = 'done', last_success = ?, attempts = 0, last_error = NULL, "
+            "next_attempt = 0 WHERE appid = ? AND prefix = ? AND item = ?",
+            [(now, *job) for job in jobs],
+        )
+        self.conn.commit()
+
+    def mark_failure(self, job: Job, error: str, now: Optional[float] = None) -> float:
+        """
+        Record a failed attempt and schedule the retry with exponential backoff.
+        Args:
+            job: (appid, game prefix, item name)
+            error: The error message
+            now: Optional current time as unix timestamp
+        Returns:
+            float: the time of the next attempt as unix timestamp
+        """
+        now = time.time() if now is None else now
+        row = self.conn.execute(
+            "SELECT attempts FROM items WHERE appid = ? AND prefix = ? AND item = ?", job
+        ).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        next_attempt = now + min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        self.conn.execute(
+            "INSERT INTO items (appid, prefix, item, status, attempts, last_error, next_attempt) "
+            "VALUES (?, ?, ?, 'failed', ?, ?, ?) "
+            "ON CONFLICT (appid, prefix, item) DO UPDATE SET status = 'failed', "
+            "attempts = excluded.attempts, last_error = excluded.last_error, next_attempt = excluded.next_attempt",
+            (*job, attempts, error, next_attempt),
+        )
+        self.conn.commit()
+        return next_attempt
+
+    def summary(self) -> dict:
+        """
+        Count the items per status.
+        Returns:
+            dict: status -> number of items
+        """
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status"))
@@ -0,0 +1,137 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# -----------------
+# CONFIG
+# -----------------
+# Points per year of plotted range that are still visible at each x-axis description,
+# None keeps every point.
+POINTS_PER_YEAR = {
+    "Years": 52,
+    "Months": 122,
+    "Weeks": 183,
+    "Days": None,
+}
+MIN_POINTS = 500  # short ranges are never thinned below this
+
+# Rollup resolutions of the price store that may replace daily values, coarsest first.
+ROLLUP_RESOLUTIONS = {
+    "Years": ["M", "W"],
+    "Months": ["W"],
+    "Weeks": [],
+    "Days": [],
+}
+PERIOD_DAYS = {"D": 1.0, "W": 7.0, "M": 30.44}
+MIN_PERIODS_VISIBLE = 120  # a rollup is only used if the range still holds this many periods
+
+
+def max_points_for(granularity: str, start, end) -> Optional[int]:
+    """
+    How many points per series are worth sending for a range and x-axis description.
+    Args:
+        granularity: The x-axis description (Years, Months, Weeks, Days)
+        start: First plotted timestamp
+        end: Last plotted timestamp
+    Returns:
+        int: the cap per series, None if nothing should be dropped
+    """
+    per_year = POINTS_PER_YEAR.get(granularity)
+    if per_year is None or start is None or end is None:
+        return None
+    years = (pd.Timestamp(end) - pd.Timestamp(start)).days / 365.25
+    return max(MIN_POINTS, int(np.ceil(years * per_year)))
+
+
+def choose_resolution(granularity: str, start, end) -> str:
+    """
+    Pick the coarsest stored resolution that still fills the plotted range.
+    Args:
+        granularity: The x-axis description (Years, Months, Weeks, Days)
+        start: First plotted timestamp
+        end: Last plotted timestamp
+    Returns:
+        str: "M", "W" or "D"
+    """
+    if start is None or end is None or pd.isna(start) or pd.isna(end):
+        return "D"
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    for resolution in ROLLUP_RESOLUTIONS.get(granularity, []):
+        if days / PERIOD_DAYS[resolution] >= MIN_PERIODS_VISIBLE:
+            return resolution
+    return "D"
+
+
+def days_to_periods(days: int, resolution: str) -> int:
+    """
+    Convert a window in days into a number of periods of a resolution, 0 stays 0 (off).
+    """
+    if days <= 0:
+        return 0
+    return max(1, int(round(days / PERIOD_DAYS[resolution])))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick n_out points that keep the shape of the line.
+    The first and last point are always kept, in between every bucket keeps the point
+    that spans the largest triangle with its neighbours, so peaks and spikes survive.
+    Args:
+        x: Ascending x values (float)
+        y: y values without NaN
+        n_out: Number of points to keep
+    Returns:
+        np.ndarray: the positions of the kept points
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Average point of every bucket, used as the third corner of the triangle.
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = avg_x[b + 1], avg_y[b + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[b + 1] = a
+    return keep
+
+
+def downsample_long(df: pd.DataFrame, max_points: Optional[int], x: str = "timestamp", y: str = "price",
+                    by: Optional[str] = "item") -> pd.DataFrame:
+    """
+    Thin every series of a long plot table to at most max_points with LTTB.
+    Rows without a y value are dropped from thinned series.
+    Args:
+        df: Long table sorted by x within every series
+        max_points: Cap per series, None returns df unchanged
+        x: The x column (timestamps)
+        y: The y column
+        by: The column naming the series, None for a single series
+    Returns:
+        pd.DataFrame: the kept rows
+    """
+    if max_points is None or df.empty:
+        return df
+    groups = [(None, df)] if by is None else df.groupby(by, sort=False)
+    frames = []
+    for _, part in groups:
+        if len(part) <= max_points:
+            frames.append(part)
+            continue
+        part = part[part[y].notna()]
+        xs = part[x].to_numpy(dtype="datetime64[ns]").astype("int64") / 86_400e9
+        keep = lttb(xs, part[y].to_numpy(dtype="float64"), max_points)
+        frames.append(part.iloc[keep])
+    return pd.concat(frames, ignore_index=True)
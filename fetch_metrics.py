@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# -----------------
+# Metrics
+# -----------------
+PROM_PREFIX = "steam_fetch"
+
+
+class FetchMetrics:
+    """
+    Thread-safe counters and timings of one crawl.
+    Stages are timed as count, total and max seconds (request, json_parse, parse_points,
+    resample, rate_limit_wait, retry_sleep, csv_write, store_write, ...), counters are
+    grouped by a label (responses by status code, retries by reason, items by outcome)
+    and gauges hold single values like the final request rate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop everything recorded so far and restart the run clock.
+        """
+        with self._lock:
+            self.started = time.time()
+            self._t0 = time.perf_counter()
+            self.stages: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "seconds": 0.0, "max": 0.0})
+            self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+            self.response_bytes = {"count": 0, "total": 0, "max": 0}
+            self.gauges: Dict[str, float] = {}
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """
+        Record the duration of one stage.
+        Args:
+            stage: The name of the stage
+            seconds: The duration
+        """
+        with self._lock:
+            s = self.stages[stage]
+            s["count"] += 1
+            s["seconds"] += seconds
+            s["max"] = max(s["max"], seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        Time the body of a with-block as one stage.
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - t0)
+
+    def inc(self, counter: str, label, amount: int = 1) -> None:
+        """
+        Increase a labelled counter.
+        Args:
+            counter: The name of the counter (responses, retries, items, cache)
+            label: The label, e.g. a status code
+            amount: The increment
+        """
+        with self._lock:
+            self.counters[counter][str(label)] += amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = float(value)
+
+    def add_response_size(self, size: int) -> None:
+        with self._lock:
+            self.response_bytes["count"] += 1
+            self.response_bytes["total"] += size
+            self.response_bytes["max"] = max(self.response_bytes["max"], size)
+
+    def summary(self) -> dict:
+        """
+        Build a machine-readable summary of the run.
+        Returns:
+            dict: run time, stages, counters, response sizes and gauges
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "run_seconds": round(time.perf_counter() - self._t0, 6),
+                "stages": {
+                    name: {"count": int(s["count"]), "seconds": round(s["seconds"], 6), "max_seconds": round(s["max"], 6)}
+                    for name, s in sorted(self.stages.items())
+                },
+                "counters": {name: dict(sorted(c.items())) for name, c in sorted(self.counters.items())},
+                "response_bytes": dict(self.response_bytes),
+                "gauges": dict(sorted(self.gauges.items())),
+            }
+
+    def to_prometheus(self, summary: Optional[dict] = None) -> str:
+        """
+        Render the summary in the Prometheus text exposition format.
+        Args:
+            summary: Optional summary, a fresh one is built otherwise
+        Returns:
+            str: the metrics text
+        """
+        summary = summary or self.summary()
+        p = PROM_PREFIX
+        lines = [
+            f"# HELP {p}_run_seconds Wall-clock time of the crawl.",
+            f"# TYPE {p}_run_seconds gauge",
+            f"{p}_run_seconds {summary['run_seconds']}",
+            f"# HELP {p}_stage_seconds_total Time spent per pipeline stage.",
+            f"# TYPE {p}_stage_seconds_total counter",
+        ]
+        lines += [f'{p}_stage_seconds_total{{stage="{name}"}} {s["seconds"]}' for name, s in summary["stages"].items()]
+        lines += [f"# HELP {p}_stage_calls_total Number of timed calls per pipeline stage.", f"# TYPE {p}_stage_calls_total counter"]
+        lines += [f'{p}_stage_calls_total{{stage="{name}"}} {s["count"]}' for name, s in summary["stages"].items()]
+        lines += [f"# HELP {p}_stage_max_seconds Longest single call per pipeline stage.", f"# TYPE {p}_stage_max_seconds gauge"]
+        lines += [f'{p}_stage_max_seconds{{stage="{name}"}} {s["max_seconds"]}' for name, s in summary["stages"].items()]
+        for name, counts in summary["counters"].items():
+            lines += [f"# HELP {p}_{name}_total Count of {name} by label.", f"# TYPE {p}_{name}_total counter"]
+            lines += [f'{p}_{name}_total{{label="{label}"}} {value}' for label, value in counts.items()]
+        rb = summary["response_bytes"]
+        lines += [
+            f"# HELP {p}_response_bytes_total Size of all response bodies.",
+            f"# TYPE {p}_response_bytes_total counter",
+            f"{p}_response_bytes_total {rb['total']}",
+            f"# HELP {p}_response_bytes_max Largest response body.",
+            f"# TYPE {p}_response_bytes_max gauge",
+            f"{p}_response_bytes_max {rb['max']}",
+        ]
+        for name, value in summary["gauges"].items():
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str, prom_path: Optional[str] = None) -> dict:
+        """
+        Write the summary as JSON and optionally in the Prometheus text format.
+        Args:
+            json_path: Path of the JSON file
+            prom_path: Optional path of the Prometheus text file
+        Returns:
+            dict: the written summary
+        """
+        summary = self.summary()
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        if prom_path:
+            with open(prom_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus(summary))
+        return summary
+
+
+# Shared recorder of the fetcher, reset at the start of every run.
+METRICS = FetchMetrics()
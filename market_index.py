@@ -0,0 +1,124 @@
+from datetime import datetime
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from price_store import read_prices
+
+# -----------------
+# CONFIG
+# -----------------
+BASE_VALUE = 100.0  # every item starts at this value on its first price from the base date on
+INDEX_COLUMNS = ["game", "timestamp", "index", "std", "smoothed", "smoothed_std", "band_low", "band_high", "items"]
+
+
+def normalize_rows(values: np.ndarray) -> np.ndarray:
+    """
+    Divide every row by its first price and scale it to BASE_VALUE.
+    Args:
+        values: (items, dates) array, NaN where an item has no price
+    Returns:
+        np.ndarray: the normalized float64 array, rows without a price stay NaN
+    """
+    values = np.asarray(values, dtype="float64")
+    if values.size == 0:
+        return values.copy()
+    present = ~np.isnan(values)
+    first = values[np.arange(len(values)), present.argmax(axis=1)]
+    first[~present.any(axis=1)] = np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = values / first[:, None] * BASE_VALUE
+    normalized[~np.isfinite(normalized)] = np.nan  # items whose first price is 0
+    return normalized
+
+
+def group_stats(values: np.ndarray, groups: np.ndarray):
+    """
+    Count, mean and sample standard deviation over the rows of every group, per column, in one pass.
+    Args:
+        values: (items, dates) array, NaN is skipped
+        groups: Group label per row, the rows must be sorted by it
+    Returns:
+        tuple: labels, counts, means and stds, each stat as a (groups, dates) array
+    """
+    labels, starts = np.unique(groups, return_index=True)
+    order = np.argsort(starts)
+    labels, starts = labels[order], starts[order]
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    counts = np.add.reduceat(valid, starts, axis=0).astype("float64")
+    sums = np.add.reduceat(filled, starts, axis=0)
+    squares = np.add.reduceat(filled * filled, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+        var = np.where(counts > 1, (squares - counts * means * means) / (counts - 1), np.nan)
+    return labels, counts, means, np.sqrt(np.clip(var, 0.0, None))
+
+
+def rolling_mean_rows(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean along the dates of every row, like Series.rolling(window, min_periods=1).mean().
+    """
+    if window <= 1 or values.size == 0:
+        return values.copy()
+    return pd.DataFrame(values.T).rolling(window, min_periods=1).mean().to_numpy().T
+
+
+def compute_market_index(prices: pd.DataFrame, window: int = 7, value_column: str = "price_mean") -> pd.DataFrame:
+    """
+    Normalized market index of every game with smoothed standard deviation bands.
+    All items are aligned on one daily axis, each item is normalized to its first price (=100),
+    then the mean, the spread across items and the item count are computed per game and day.
+    Args:
+        prices: Long table with game, item, timestamp and the value column
+        window: Rolling window in days for the smoothed index and band
+        value_column: The price column to index
+    Returns:
+        pd.DataFrame: game, timestamp, index, std, smoothed, smoothed_std, band_low, band_high, items
+    """
+    if prices.empty:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    wide = prices.pivot_table(index=["game", "item"], columns="timestamp", values=value_column, aggfunc="first", dropna=False)
+    wide = wide.sort_index()
+    dates = pd.date_range(wide.columns.min(), wide.columns.max(), freq="D")
+    wide = wide.reindex(columns=dates)
+
+    normalized = normalize_rows(wide.to_numpy(dtype="float64"))
+    games, counts, means, stds = group_stats(normalized, wide.index.get_level_values("game").to_numpy())
+    smoothed = rolling_mean_rows(means, window)
+    smoothed_std = rolling_mean_rows(stds, window)
+
+    n_games, n_dates = means.shape
+    out = pd.DataFrame({
+        "game": np.repeat(games, n_dates),
+        "timestamp": np.tile(dates.to_numpy(), n_games),
+        "index": means.ravel(),
+        "std": stds.ravel(),
+        "smoothed": smoothed.ravel(),
+        "smoothed_std": smoothed_std.ravel(),
+        "items": counts.ravel().astype("int64"),
+    })
+    out["band_low"] = out["smoothed"] - out["smoothed_std"]
+    out["band_high"] = out["smoothed"] + out["smoothed_std"]
+    return out.loc[out["items"] > 0, INDEX_COLUMNS].reset_index(drop=True)
+
+
+def load_market_index(store_dir: str, base_date: Optional[Union[str, datetime]] = None,
+                      end_date: Optional[Union[str, datetime]] = None, window: int = 7,
+                      games: Optional[List[str]] = None, value_column: str = "price_mean") -> pd.DataFrame:
+    """
+    Read the stored prices from the base date on and compute the market index of every game.
+    Args:
+        store_dir: The root directory of the price store
+        base_date: Optional first date, items are normalized to their first price from here on
+        end_date: Optional last date (inclusive)
+        window: Rolling window in days
+        games: Optional game labels
+        value_column: The price column to index
+    Returns:
+        pd.DataFrame: see compute_market_index
+    """
+    prices = read_prices(store_dir, games=games, start=base_date, end=end_date,
+                         columns=["game", "item", "timestamp", value_column])
+    return compute_market_index(prices, window=window, value_column=value_column)
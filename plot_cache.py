@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+# -----------------
+# CONFIG
+# -----------------
+PLOT_CACHE_MB = 256  # memory cap of the derived plot frames of all sessions
+
+
+def nbytes(value: Any) -> int:
+    """
+    Approximate memory size of a cached value: frames, arrays and tuples, lists or dicts of them.
+    Args:
+        value: The value
+    Returns:
+        int: the size in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    return 64
+
+
+class PlotDataCache:
+    """
+    Thread-safe LRU cache of derived plot data, shared by all sessions of the dashboard.
+    Entries are keyed by the canonical filter state, so a view that any session asked for
+    before is served without pandas work. The least recently used entries are evicted
+    once the cached values use more than max_bytes.
+    Args:
+        max_bytes: The memory cap
+    """
+
+    def __init__(self, max_bytes: int = PLOT_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value of key, or compute and cache it.
+        The value is shared, callers must not modify it.
+        Args:
+            key: Hashable filter state
+            compute: Builds the value on a miss
+        Returns:
+            the value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        size = nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: entries, bytes, hits, misses and evictions
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
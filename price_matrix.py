@@ -0,0 +1,192 @@
+import json
+import os
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from price_store import display_name, read_item_index, read_prices
+
+# -----------------
+# CONFIG
+# -----------------
+META_FILE = "matrix.json"
+DTYPE = "float32"
+
+
+# -----------------
+# Builder
+# -----------------
+def build_price_matrix(store_dir: str, out_dir: str, value_column: str = "price_median") -> Optional[str]:
+    """
+    Precompute the aligned date x item matrix of one price column from the store.
+    The values are stored as raw float32 with one contiguous row per item (items x dates),
+    so selecting items and a date range only touches the pages that are needed.
+    The metadata is replaced atomically, readers never see a half written matrix.
+    Args:
+        store_dir: The root directory of the price store
+        out_dir: The directory of the matrix files
+        value_column: The price column to store
+    Returns:
+        str: the path of the metadata file, None if the store is empty
+    """
+    prices = read_prices(store_dir, columns=["game", "item", "timestamp", value_column])
+    if prices.empty:
+        return None
+    index = read_item_index(store_dir)
+    prefixes = dict(zip(zip(index["game"].astype(str), index["item"]), index["prefix"]))
+    prices["name"] = [display_name(g, i, prefixes.get((g, i))) for g, i in zip(prices["game"], prices["item"])]
+    wide = prices.pivot(index="name", columns="timestamp", values=value_column)
+    dates = pd.date_range(wide.columns.min(), wide.columns.max(), freq="D")
+    wide = wide.reindex(columns=dates).sort_index()
+
+    os.makedirs(out_dir, exist_ok=True)
+    data_file = f"values_{uuid.uuid4().hex[:12]}.{DTYPE}"
+    values = np.ascontiguousarray(wide.to_numpy(dtype=DTYPE))
+    values.tofile(os.path.join(out_dir, data_file))
+
+    meta = {
+        "data_file": data_file,
+        "dtype": DTYPE,
+        "value_column": value_column,
+        "start": dates[0].strftime("%Y-%m-%d"),
+        "n_dates": len(dates),
+        "items": list(wide.index),
+    }
+    meta_path = os.path.join(out_dir, META_FILE)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    # Old data files stay readable for open memory maps until they are closed.
+    for name in os.listdir(out_dir):
+        if name.startswith("values_") and name != data_file:
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError:
+                pass
+    return meta_path
+
+
+# -----------------
+# Reader
+# -----------------
+class PriceMatrix:
+    """
+    Read-only memory-mapped date x item price matrix.
+    The mapping is shared by every session of the dashboard, slices are views on it
+    and nothing is copied until a calculation needs the values.
+    Args:
+        out_dir: The directory written by build_price_matrix
+    """
+
+    def __init__(self, out_dir: str):
+        with open(os.path.join(out_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.items: List[str] = meta["items"]
+        self.positions = {name: i for i, name in enumerate(self.items)}
+        self.dates = pd.date_range(meta["start"], periods=meta["n_dates"], freq="D")
+        self.values = np.memmap(os.path.join(out_dir, meta["data_file"]), dtype=meta["dtype"], mode="r",
+                                shape=(len(self.items), meta["n_dates"]))
+
+    @staticmethod
+    def exists(out_dir: str) -> bool:
+        return os.path.exists(os.path.join(out_dir, META_FILE))
+
+    def covers(self, items: List[str]) -> bool:
+        return all(item in self.positions for item in items)
+
+    def date_slice(self, start=None, end=None) -> slice:
+        """
+        Convert an inclusive date range into a column slice.
+        """
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), side="left"))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side="right"))
+        return slice(lo, hi)
+
+    def select(self, items: List[str], start=None, end=None) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """
+        Slice the matrix for some items and a date range.
+        Args:
+            items: Item names, in the order of the returned rows
+            start: Optional first date (inclusive)
+            end: Optional last date (inclusive)
+        Returns:
+            tuple: the dates and a (len(items), len(dates)) float32 array
+        """
+        cols = self.date_slice(start, end)
+        rows = [self.positions[item] for item in items]
+        return self.dates[cols], self.values[rows, cols]
+
+
+def nan_mean(values: np.ndarray) -> np.ndarray:
+    """
+    Mean over the items (axis 0) that ignores missing prices, NaN where no item has a price.
+    Args:
+        values: (items, dates) array
+    Returns:
+        np.ndarray: the mean per date
+    """
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    sums = np.where(valid, values, 0.0).sum(axis=0, dtype="float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def mask_outside_range(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Set the days before the first and after the last price of every item to NaN.
+    Rolled rows carry values past the end of an item, they must not reach the average.
+    Args:
+        values: (items, dates) array
+        valid: Array of the same shape whose prices decide where an item starts and ends
+    Returns:
+        np.ndarray: a float64 copy of values
+    """
+    values = np.array(values, dtype="float64")
+    present = ~np.isnan(valid)
+    if values.size == 0:
+        return values
+    n = present.shape[1]
+    first = present.argmax(axis=1)
+    last = n - 1 - present[:, ::-1].argmax(axis=1)
+    cols = np.arange(n)
+    inside = (cols >= first[:, None]) & (cols <= last[:, None]) & present.any(axis=1)[:, None]
+    values[~inside] = np.nan
+    return values
+
+
+def to_long(names: List[str], dates: pd.DatetimeIndex, values: np.ndarray, valid: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Turn an aligned slice into the long timestamp/price/item table used for plotting.
+    Leading and trailing days without a price are dropped per item, gaps inside stay NaN.
+    Args:
+        names: Item name per row of values
+        dates: The dates of the columns
+        values: (items, dates) array
+        valid: Optional array of the same shape whose prices decide where an item starts and ends,
+            e.g. the raw prices when values are rolled
+    Returns:
+        pd.DataFrame: timestamp, price and item in the order of names
+    """
+    valid = values if valid is None else valid
+    frames = []
+    for name, row, raw in zip(names, values, valid):
+        present = np.flatnonzero(~np.isnan(raw))
+        if present.size == 0:
+            continue
+        lo, hi = present[0], present[-1] + 1
+        frames.append(pd.DataFrame({"timestamp": dates[lo:hi], "price": np.asarray(row[lo:hi], dtype="float64"), "item": name}))
+    if not frames:
+        return pd.DataFrame(columns=["timestamp", "price", "item"])
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    store = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "price_store")
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.join("data", "price_matrix")
+    print(f"Wrote {build_price_matrix(store, out)}")
@@ -0,0 +1,373 @@
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# -----------------
+# CONFIG
+# -----------------
+STORE_COLUMNS = ["game", "item", "timestamp", "price_mean", "price_median", "volume_sum"]
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 16384  # rows are sorted by item, so small row groups let filters skip most items
+PARTITION_FILE = "prices.parquet"
+INDEX_FILE = "_item_index.parquet"  # the leading underscore keeps it out of dataset scans
+INDEX_COLUMNS = ["game", "item", "prefix", "start", "end", "rows"]  # prefix: of the item's CSV file, see display_name
+ROLLUP_DIR = "_rollups"  # next to the daily partitions, skipped by their scans like the index
+ROLLUP_FREQS = {"W": "W-MON", "M": "MS"}  # resolution -> pandas frequency, labelled by the period start
+ROLLUP_COLUMNS = ["game", "item", "timestamp", "price_median", "price_mean", "price_min", "price_max", "volume_sum"]
+STAGING_DIR = "_staged"  # flushed batches of a running crawl, folded into the partitions by compact_prices
+
+SCHEMA = pa.schema([
+    ("item", pa.string()),
+    ("timestamp", pa.timestamp("ns")),
+    ("price_mean", pa.float64()),
+    ("price_median", pa.float64()),
+    ("volume_sum", pa.float64()),
+])
+
+ROLLUP_SCHEMA = pa.schema([
+    ("item", pa.string()),
+    ("timestamp", pa.timestamp("ns")),
+    ("price_median", pa.float64()),
+    ("price_mean", pa.float64()),
+    ("price_min", pa.float64()),
+    ("price_max", pa.float64()),
+    ("volume_sum", pa.float64()),
+])
+
+# -----------------
+# Helpers
+# -----------------
+def partition_path(store_dir: str, game: str, resolution: str = "D") -> str:
+    """
+    Build the path of the parquet file for one game.
+    Args:
+        store_dir: The root directory of the store
+        game: The game label (CS, Dota, TF2)
+        resolution: "D" for the daily prices, "W" or "M" for the rollups
+    Returns:
+        str: the path of the partition file
+    """
+    return os.path.join(resolution_dir(store_dir, resolution), f"game={game}", PARTITION_FILE)
+
+def resolution_dir(store_dir: str, resolution: str = "D") -> str:
+    """
+    Build the root directory of the daily prices or of one rollup.
+    Args:
+        store_dir: The root directory of the store
+        resolution: "D", "W" or "M"
+    Returns:
+        str: the directory holding the game partitions
+    """
+    if resolution == "D":
+        return store_dir
+    if resolution not in ROLLUP_FREQS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    return os.path.join(store_dir, ROLLUP_DIR, f"freq={resolution}")
+
+def _write_partition(path: str, table: pa.Table) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # The leading underscore keeps an unfinished file out of dataset scans, like the index.
+    tmp_path = os.path.join(os.path.dirname(path), "_" + os.path.basename(path) + ".tmp")
+    pq.write_table(table, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+def _upsert(old: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace the rows of every item in new from its first new timestamp on.
+    """
+    if old is not None:
+        first_new = new.groupby("item")["timestamp"].min()
+        cutoff = old["item"].map(first_new)
+        old = old[cutoff.isna() | (old["timestamp"] < cutoff)]
+        new = pd.concat([old, new], ignore_index=True)
+    return new.sort_values(["item", "timestamp"], kind="stable").reset_index(drop=True)
+
+def upsert_batches(df: pd.DataFrame, time_column: str = "timestamp", keys: Sequence[str] = ("game", "item"),
+                   batch_column: str = "batch") -> pd.DataFrame:
+    """
+    Apply numbered batches of rows like consecutive upserts, in one vectorized pass.
+    A row is dropped if a later batch holds the same keys from an earlier or the same time on.
+    Args:
+        df: The rows of all batches
+        time_column: The column the upserts cut at
+        keys: The columns naming a series
+        batch_column: The batch number, higher numbers were written later
+    Returns:
+        pd.DataFrame: the remaining rows without the batch column
+    """
+    keys = list(keys)
+    first = df.groupby(keys + [batch_column], sort=False)[time_column].min().reset_index()
+    first = first.sort_values(keys + [batch_column], ascending=[True] * len(keys) + [False])
+    # Earliest start of all later batches of the same series
+    first["cutoff"] = first.groupby(keys, sort=False)[time_column].cummin()
+    first["cutoff"] = first.groupby(keys, sort=False)["cutoff"].shift()
+    df = df.merge(first[keys + [batch_column, "cutoff"]], on=keys + [batch_column], how="left")
+    df = df[df["cutoff"].isna() | (df[time_column] < df["cutoff"])]
+    return df.drop(columns=[batch_column, "cutoff"]).reset_index(drop=True)
+
+def display_name(game: str, item: str, prefix: Optional[str] = None) -> str:
+    """
+    Build the item label used by the dashboard, it matches the names derived from the CSV files.
+    The label is the CSV file name of the item without "_history" and with spaces for underscores,
+    so it starts with the CSV prefix of its crawl job ("CS_", "Dota_", "" for the default item list).
+    Args:
+        game: The game label
+        item: The market hash name of the item
+        prefix: The CSV prefix of the item as kept in the item index. Without it (stores written
+            before the index kept it) CS items are unprefixed and other games prefixed with their label
+    Returns:
+        str: the label of the item
+    """
+    if not isinstance(prefix, str):
+        prefix = "" if game == "CS" else f"{game}_"
+    return f"{prefix}{item}".replace("|", "").replace("/", "-").replace("_", " ")
+
+# -----------------
+# Writer
+# -----------------
+def write_prices(df: pd.DataFrame, store_dir: str) -> None:
+    """
+    Upsert daily prices into the store.
+    For every item the stored rows from its first new timestamp on are replaced,
+    so full histories and incremental refreshes can both be written.
+    Each game partition is kept sorted by item and timestamp.
+    The weekly and monthly rollups of the changed items are updated from the first touched period on.
+    Args:
+        df: Long table with the columns game, item, timestamp, price_mean, price_median, volume_sum
+            and optionally prefix, the CSV prefix of the item that is kept in the item index
+        store_dir: The root directory of the store
+    """
+    if df.empty:
+        return
+    df = df[STORE_COLUMNS + [c for c in ("prefix",) if c in df.columns]].copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+    for game, new in df.groupby("game", sort=False):
+        path = partition_path(store_dir, game)
+        new = new.drop(columns="game")
+        prefixes = new.groupby("item")["prefix"].last() if "prefix" in new.columns else None
+        new = new[STORE_COLUMNS[1:]]
+        first_new = new.groupby("item")["timestamp"].min()
+        old = pq.read_table(path).to_pandas() if os.path.exists(path) else None
+        prices = _upsert(old, new)
+
+        _write_partition(path, pa.Table.from_pandas(prices, schema=SCHEMA, preserve_index=False))
+        update_item_index(store_dir, game, prices, prefixes)
+        update_rollups(store_dir, game, prices, first_new)
+
+def stage_prices(df: pd.DataFrame, store_dir: str) -> None:
+    """
+    Durably write a batch of daily prices without touching the partitions.
+    A crawl stages every flush and folds all of them in once with compact_prices, so each
+    partition, the index and the rollups are rewritten once per run instead of once per flush.
+    Staged rows are not visible to read_prices until then.
+    Args:
+        df: Long table with the columns game, item, timestamp, price_mean, price_median, volume_sum
+            and optionally prefix, see write_prices
+        store_dir: The root directory of the store
+    """
+    if df.empty:
+        return
+    df = df[STORE_COLUMNS + [c for c in ("prefix",) if c in df.columns]].copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    staging = os.path.join(store_dir, STAGING_DIR)
+    os.makedirs(staging, exist_ok=True)
+    name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"  # names sort in write order
+    tmp_path = os.path.join(staging, f"_{name}.tmp")
+    df.to_parquet(tmp_path, index=False, compression=COMPRESSION)
+    os.replace(tmp_path, os.path.join(staging, name))
+
+def compact_prices(store_dir: str) -> int:
+    """
+    Upsert all staged batches into the store in write order, then remove them.
+    Batches left over by a crashed crawl are folded in as well.
+    Args:
+        store_dir: The root directory of the store
+    Returns:
+        int: the number of written rows
+    """
+    staging = os.path.join(store_dir, STAGING_DIR)
+    if not os.path.isdir(staging):
+        return 0
+    files = sorted(f for f in os.listdir(staging) if f.endswith(".parquet") and not f.startswith("_"))
+    if not files:
+        return 0
+    batches = [pd.read_parquet(os.path.join(staging, f)).assign(batch=i) for i, f in enumerate(files)]
+    staged = upsert_batches(pd.concat(batches, ignore_index=True))
+    write_prices(staged, store_dir)
+    for f in files:
+        os.remove(os.path.join(staging, f))
+    return len(staged)
+
+def update_item_index(store_dir: str, game: str, prices: pd.DataFrame, prefixes: Optional[pd.Series] = None) -> None:
+    """
+    Replace the index entries of one game with the date range and row count of every item.
+    Args:
+        store_dir: The root directory of the store
+        game: The game label
+        prices: All stored rows of the game (item, timestamp, ...)
+        prefixes: Optional CSV prefix per item (indexed by item), items without one keep their indexed prefix
+    """
+    entries = prices.groupby("item", sort=True)["timestamp"].agg(start="min", end="max", rows="size").reset_index()
+    entries.insert(0, "game", game)
+    index = read_item_index(store_dir)
+    known = index[index["game"] == game].set_index("item")["prefix"]
+    if prefixes is not None:
+        known = prefixes.combine_first(known)
+    entries.insert(2, "prefix", entries["item"].map(known))
+    index = pd.concat([index[index["game"] != game], entries], ignore_index=True)
+    index = index[INDEX_COLUMNS].sort_values(["game", "item"]).reset_index(drop=True)
+    path = os.path.join(store_dir, INDEX_FILE)
+    index.to_parquet(path + ".tmp", index=False, compression=COMPRESSION)
+    os.replace(path + ".tmp", path)
+
+def read_item_index(store_dir: str) -> pd.DataFrame:
+    """
+    Read the item index of the store, it lists every item without touching the price data.
+    Args:
+        store_dir: The root directory of the store
+    Returns:
+        pd.DataFrame: game, item, prefix (NaN if unknown), start, end and rows per item
+    """
+    path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.read_parquet(path).reindex(columns=INDEX_COLUMNS)  # indexes written before the prefix column
+
+def rebuild_item_index(store_dir: str) -> pd.DataFrame:
+    """
+    Build the item index from the stored prices, for stores written before the index existed.
+    Args:
+        store_dir: The root directory of the store
+    Returns:
+        pd.DataFrame: the new index
+    """
+    prices = read_prices(store_dir, columns=["game", "item", "timestamp"])
+    for game, rows in prices.groupby("game", sort=False):
+        update_item_index(store_dir, game, rows)
+    return read_item_index(store_dir)
+
+# -----------------
+# Rollups
+# -----------------
+def rollup(prices: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """
+    Aggregate daily prices of one game to weekly or monthly values per item.
+    Args:
+        prices: Daily rows with item, timestamp, price_mean, price_median, volume_sum
+        resolution: "W" or "M"
+    Returns:
+        pd.DataFrame: item, period start and median, mean, min, max of the daily medians and the volume sum
+    """
+    if prices.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS[1:])
+    grouper = pd.Grouper(key="timestamp", freq=ROLLUP_FREQS[resolution], label="left", closed="left")
+    out = prices.groupby(["item", grouper], sort=True).agg(
+        price_median=("price_median", "median"),
+        price_mean=("price_mean", "mean"),
+        price_min=("price_median", "min"),
+        price_max=("price_median", "max"),
+        volume_sum=("volume_sum", "sum"),
+    ).reset_index()
+    return out[ROLLUP_COLUMNS[1:]]
+
+def update_rollups(store_dir: str, game: str, prices: pd.DataFrame, since: Optional[pd.Series] = None) -> None:
+    """
+    Update the weekly and monthly rollups of one game.
+    Only the periods from the one containing the first new timestamp of an item on are recomputed.
+    Args:
+        store_dir: The root directory of the store
+        game: The game label
+        prices: All stored daily rows of the game
+        since: Optional first new timestamp per item (indexed by item), all items are rebuilt otherwise
+    """
+    for resolution in ROLLUP_FREQS:
+        path = partition_path(store_dir, game, resolution)
+        old = pq.read_table(path).to_pandas() if os.path.exists(path) else None
+        if since is None or old is None:
+            changed, old = prices, None
+        else:
+            # Start of the period holding the first new day, earlier periods are unchanged.
+            cutoff = prices["item"].map(period_start(since, resolution))
+            changed = prices[cutoff.notna() & (prices["timestamp"] >= cutoff)]
+        table = pa.Table.from_pandas(_upsert(old, rollup(changed, resolution)), schema=ROLLUP_SCHEMA, preserve_index=False)
+        _write_partition(path, table)
+
+def rebuild_rollups(store_dir: str) -> None:
+    """
+    Build the rollups of every game from the stored prices, for stores written before rollups existed.
+    Args:
+        store_dir: The root directory of the store
+    """
+    prices = read_prices(store_dir)
+    for game, rows in prices.groupby("game", sort=False):
+        update_rollups(store_dir, game, rows.drop(columns="game"))
+
+def period_start(timestamps: pd.Series, resolution: str) -> pd.Series:
+    """
+    First day of the week (Monday) or month that holds each timestamp.
+    Args:
+        timestamps: Datetime series
+        resolution: "W" or "M"
+    Returns:
+        pd.Series: the period starts, they match the timestamps of the rollups
+    """
+    days = timestamps.dt.normalize()
+    if resolution == "W":
+        return days - pd.to_timedelta(days.dt.dayofweek, unit="D")
+    return days - pd.to_timedelta(days.dt.day - 1, unit="D")
+
+def has_rollups(store_dir: str, resolution: str) -> bool:
+    return os.path.isdir(resolution_dir(store_dir, resolution))
+
+# -----------------
+# Reader
+# -----------------
+def read_prices(store_dir: str, items: Optional[List[str]] = None, games: Optional[List[str]] = None,
+                start: Optional[Union[str, datetime]] = None, end: Optional[Union[str, datetime]] = None,
+                columns: Optional[List[str]] = None, resolution: str = "D") -> pd.DataFrame:
+    """
+    Read prices from the store in one columnar scan.
+    The filters are pushed down, so partitions and row groups outside of them are skipped.
+    Args:
+        store_dir: The root directory of the store
+        items: Optional market hash names to read
+        games: Optional game labels to read
+        start: Optional first timestamp (inclusive)
+        end: Optional last timestamp (inclusive)
+        columns: Optional columns to read, all columns of the resolution otherwise
+        resolution: "D" for the daily prices, "W" or "M" for the weekly or monthly rollups
+            (timestamps are period starts)
+    Returns:
+        pd.DataFrame: the long table sorted by game, item and timestamp
+    """
+    columns = columns or (STORE_COLUMNS if resolution == "D" else ROLLUP_COLUMNS)
+    root = resolution_dir(store_dir, resolution)
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=columns)
+
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    expr = None
+    for cond in (
+        ds.field("item").isin(items) if items is not None else None,
+        ds.field("game").isin(games) if games is not None else None,
+        ds.field("timestamp") >= pd.Timestamp(start) if start is not None else None,
+        ds.field("timestamp") <= pd.Timestamp(end) if end is not None else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    if "game" in df.columns:
+        df["game"] = df["game"].astype(str)
+    sort_cols = [c for c in ("game", "item", "timestamp") if c in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+    return df
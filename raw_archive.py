@@ -0,0 +1,221 @@
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from aggregation import aggregate_points
+from price_store import upsert_batches
+
+# -----------------
+# CONFIG
+# -----------------
+ARCHIVE_DIR = os.path.join("data", "raw_archive")
+PARTITION_FILE = "points.parquet"
+POINT_COLUMNS = ["game", "item", "timestamp", "price", "volume"]
+HOUR_NS = 3600 * 10**9
+PRICE_SCALE = 1000  # prices are stored as integer thousandths, Steam's hourly medians carry three decimals
+# Prices and volumes are int64: in currencies like IDR or VND a price in thousandths passes the int32 range,
+# the delta encoding keeps the wider column about as small.
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 65536  # larger than the price store, long delta runs compress better
+DELTA = "DELTA_BINARY_PACKED"  # hours grow by small steps and prices move little, so the deltas pack into few bits
+STAGING_DIR = "_staged"  # flushed batches of a running crawl, folded into the partitions by compact_points
+
+SCHEMA = pa.schema([
+    ("item", pa.string()),
+    ("hour", pa.int32()),  # hours since epoch
+    ("price", pa.int64()),  # price * PRICE_SCALE
+    ("volume", pa.int64()),
+])
+READ_SCHEMA = SCHEMA.append(pa.field("game", pa.string()))  # archives written with int32 columns are widened
+
+# -----------------
+# Helpers
+# -----------------
+def archive_path(archive_dir: str, game: str) -> str:
+    """
+    Build the path of the parquet file holding the raw points of one game.
+    Args:
+        archive_dir: The root directory of the archive
+        game: The game label (CS, Dota, TF2)
+    Returns:
+        str: the path of the partition file
+    """
+    return os.path.join(archive_dir, f"game={game}", PARTITION_FILE)
+
+def encode_points(points: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn raw points into the compact integer columns of the archive.
+    Args:
+        points: Table with the columns item, timestamp, price, volume
+    Returns:
+        pd.DataFrame: item, hour (int32), price and volume (int64), sorted by item and hour
+    Raises:
+        ValueError: If a price or volume is missing or does not fit into int64
+    """
+    ts = pd.to_datetime(points["timestamp"]).to_numpy(dtype="datetime64[ns]").astype("int64")
+    prices = np.rint(points["price"].to_numpy(dtype="float64") * PRICE_SCALE)
+    volumes = np.rint(points["volume"].to_numpy(dtype="float64"))
+    limit = float(np.iinfo(np.int64).max)
+    for name, values in (("price", prices), ("volume", volumes)):
+        if not np.isfinite(values).all() or (np.abs(values) >= limit).any():
+            raise ValueError(f"Cannot archive the {name} values, they are missing or out of range")
+    encoded = pd.DataFrame({
+        "item": points["item"].astype(str).to_numpy(),
+        "hour": (ts // HOUR_NS).astype("int32"),
+        "price": prices.astype("int64"),
+        "volume": volumes.astype("int64"),
+    })
+    return encoded.sort_values(["item", "hour"], kind="stable").reset_index(drop=True)
+
+def decode_points(encoded: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn archive rows back into raw points, the inverse of encode_points.
+    Args:
+        encoded: Table with the columns item, hour, price, volume (and optionally game)
+    Returns:
+        pd.DataFrame: the columns of encoded with timestamp, price and volume as datetime and float
+    """
+    decoded = encoded.drop(columns=["hour", "price", "volume"])
+    decoded["timestamp"] = (encoded["hour"].to_numpy(dtype="int64") * HOUR_NS).astype("datetime64[ns]")
+    decoded["price"] = encoded["price"].to_numpy(dtype="float64") / PRICE_SCALE
+    decoded["volume"] = encoded["volume"].to_numpy(dtype="float64")
+    return decoded
+
+def _write_partition(path: str, table: pa.Table) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # The leading underscore keeps an unfinished file out of dataset scans.
+    tmp_path = os.path.join(os.path.dirname(path), "_" + os.path.basename(path) + ".tmp")
+    pq.write_table(table, tmp_path, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE,
+                   use_dictionary=["item"], column_encoding={"hour": DELTA, "price": DELTA, "volume": DELTA})
+    os.replace(tmp_path, path)
+
+def _upsert_partition(path: str, new: pd.DataFrame) -> None:
+    if os.path.exists(path):
+        old = pq.read_table(path).cast(SCHEMA).to_pandas()
+        cutoff = old["item"].map(new.groupby("item")["hour"].min())
+        old = old[cutoff.isna() | (old["hour"] < cutoff)]
+        new = pd.concat([old, new], ignore_index=True)
+    new = new.sort_values(["item", "hour"], kind="stable")
+    _write_partition(path, pa.Table.from_pandas(new, schema=SCHEMA, preserve_index=False))
+
+# -----------------
+# Writer
+# -----------------
+def write_points(points: pd.DataFrame, archive_dir: str = ARCHIVE_DIR) -> None:
+    """
+    Upsert raw price points into the archive.
+    For every item the archived points from its first new hour on are replaced,
+    so full histories and incremental refreshes can both be written.
+    Args:
+        points: Long table with the columns game, item, timestamp, price, volume
+        archive_dir: The root directory of the archive
+    """
+    if points.empty:
+        return
+    for game, new in points.groupby("game", sort=False):
+        _upsert_partition(archive_path(archive_dir, game), encode_points(new))
+
+def stage_points(points: pd.DataFrame, archive_dir: str = ARCHIVE_DIR) -> None:
+    """
+    Durably write a batch of raw points without touching the partitions.
+    Staged points are not visible to read_points until compact_points folds them in.
+    Args:
+        points: Long table with the columns game, item, timestamp, price, volume
+        archive_dir: The root directory of the archive
+    """
+    if points.empty:
+        return
+    encoded = pd.concat([encode_points(part).assign(game=game) for game, part in points.groupby("game", sort=False)],
+                        ignore_index=True)
+    staging = os.path.join(archive_dir, STAGING_DIR)
+    os.makedirs(staging, exist_ok=True)
+    name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"  # names sort in write order
+    tmp_path = os.path.join(staging, f"_{name}.tmp")
+    encoded.to_parquet(tmp_path, index=False, compression=COMPRESSION)
+    os.replace(tmp_path, os.path.join(staging, name))
+
+def compact_points(archive_dir: str = ARCHIVE_DIR) -> int:
+    """
+    Upsert all staged batches into the archive in write order, then remove them.
+    Every game partition is rewritten once, however many batches were staged.
+    Args:
+        archive_dir: The root directory of the archive
+    Returns:
+        int: the number of written points
+    """
+    staging = os.path.join(archive_dir, STAGING_DIR)
+    if not os.path.isdir(staging):
+        return 0
+    files = sorted(f for f in os.listdir(staging) if f.endswith(".parquet") and not f.startswith("_"))
+    if not files:
+        return 0
+    batches = [pd.read_parquet(os.path.join(staging, f)).assign(batch=i) for i, f in enumerate(files)]
+    staged = upsert_batches(pd.concat(batches, ignore_index=True), time_column="hour")
+    for game, new in staged.groupby("game", sort=False):
+        _upsert_partition(archive_path(archive_dir, game), new.drop(columns="game"))
+    for f in files:
+        os.remove(os.path.join(staging, f))
+    return len(staged)
+
+# -----------------
+# Reader
+# -----------------
+def read_points(archive_dir: str = ARCHIVE_DIR, items: Optional[List[str]] = None, games: Optional[List[str]] = None,
+                start: Optional[Union[str, datetime]] = None, end: Optional[Union[str, datetime]] = None) -> pd.DataFrame:
+    """
+    Read raw points from the archive in one columnar scan, the filters are pushed down.
+    Args:
+        archive_dir: The root directory of the archive
+        items: Optional market hash names to read
+        games: Optional game labels to read
+        start: Optional first timestamp (inclusive)
+        end: Optional last timestamp (inclusive)
+    Returns:
+        pd.DataFrame: game, item, timestamp, price, volume sorted by game, item and timestamp
+    """
+    if not os.path.isdir(archive_dir):
+        return pd.DataFrame(columns=POINT_COLUMNS)
+
+    expr = None
+    for cond in (
+        ds.field("item").isin(items) if items is not None else None,
+        ds.field("game").isin(games) if games is not None else None,
+        ds.field("hour") >= int(np.ceil(pd.Timestamp(start).value / HOUR_NS)) if start is not None else None,
+        ds.field("hour") <= pd.Timestamp(end).value // HOUR_NS if end is not None else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+
+    dataset = ds.dataset(archive_dir, format="parquet", partitioning="hive", schema=READ_SCHEMA)
+    encoded = dataset.to_table(filter=expr).to_pandas()
+    encoded["game"] = encoded["game"].astype(str)
+    encoded = encoded.sort_values(["game", "item", "hour"], kind="stable").reset_index(drop=True)
+    return decode_points(encoded)[POINT_COLUMNS]
+
+def resample_points(archive_dir: str = ARCHIVE_DIR, resolution: str = "D", items: Optional[List[str]] = None,
+                    games: Optional[List[str]] = None, start: Optional[Union[str, datetime]] = None,
+                    end: Optional[Union[str, datetime]] = None, processes: Optional[int] = None) -> pd.DataFrame:
+    """
+    Re-aggregate archived points to any resolution without fetching them again.
+    At "D" the result matches the daily values of fetch_pricehistory.
+    Args:
+        archive_dir: The root directory of the archive
+        resolution: "h", "D", "W" (weeks from Monday), "M" (months) or another fixed length like "6h"
+        items: Optional market hash names to read
+        games: Optional game labels to read
+        start: Optional first timestamp of the points (inclusive)
+        end: Optional last timestamp of the points (inclusive)
+        processes: Optional number of worker processes for very large batches
+    Returns:
+        pd.DataFrame: game, item, timestamp (bucket start), price_mean, price_median, volume_sum
+    """
+    points = read_points(archive_dir, items=items, games=games, start=start, end=end)
+    return aggregate_points(points, resolution=resolution, processes=processes)
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+
+# -----------------
+# CONFIG
+# -----------------
+CACHE_TTL_HOURS = 12.0
+CACHE_MAX_MB = 512.0
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for raw pricehistory responses.
+    Every response body is stored in <cache_dir>/<sha256 of the url>.json behind a first line
+    with its creation time. The file mtime is refreshed on every hit, so the least recently
+    used entries are evicted first once the cache grows beyond its size cap.
+    Args:
+        cache_dir: Directory of the cache files
+        ttl_hours: Hours after which an entry is stale, None to never expire
+        max_mb: Size cap of the cache in megabytes
+        offline: Serve only from the cache (expired entries included) and never touch the network
+    """
+
+    def __init__(self, cache_dir: str, ttl_hours: Optional[float] = CACHE_TTL_HOURS, max_mb: float = CACHE_MAX_MB, offline: bool = False):
+        self.cache_dir = cache_dir
+        self.ttl = None if ttl_hours is None else ttl_hours * 3600.0
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, url: str) -> str:
+        """
+        Build the file path of a cached url.
+        Args:
+            url: The requested url
+        Returns:
+            str: the path of the cache file
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url: str, ignore_ttl: bool = False) -> Optional[bytes]:
+        """
+        Read a cached response body.
+        Args:
+            url: The requested url
+            ignore_ttl: Return expired entries as well
+        Returns:
+            bytes: the response body, None if it is missing or expired
+        """
+        path = self.path(url)
+        try:
+            with open(path, "rb") as f:
+                created = float(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        expires = not (self.offline or ignore_ttl) and self.ttl is not None
+        if expires and time.time() - created > self.ttl:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return body
+
+    def put(self, url: str, body: bytes) -> None:
+        """
+        Store a response body and evict the least recently used entries if the cache is full.
+        Args:
+            url: The requested url
+            body: The raw response body
+        """
+        path = self.path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(f"{time.time():.3f}\n".encode("ascii"))
+            f.write(body)
+        new_size = os.path.getsize(tmp_path)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += new_size - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        return sum(e.stat().st_size for e in os.scandir(self.cache_dir) if e.name.endswith(".json"))
+
+    def _evict(self) -> None:
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".json")]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        size = sum(e.stat().st_size for e in entries)
+        # Shrink to 90% so a full cache doesn't evict on every write.
+        target = int(self.max_bytes * 0.9)
+        for e in entries:
+            if size <= target:
+                break
+            try:
+                size -= e.stat().st_size
+                os.remove(e.path)
+            except OSError:
+                continue
+        self._size = size
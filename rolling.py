@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, List
+
+import numpy as np
+import pandas as pd
+
+# -----------------
+# CONFIG
+# -----------------
+ROLLING_CACHE_ENTRIES = 1024  # rolled item rows kept in memory
+
+
+def rolling_median(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling median of every row of an aligned (items, dates) array in one pass.
+    Missing prices are skipped like in Series.rolling(window, min_periods=1).median().
+    Args:
+        values: (items, dates) array
+        window: The window in days, 0 or 1 returns the values unchanged
+    Returns:
+        np.ndarray: (items, dates) float64 array
+    """
+    values = np.asarray(values, dtype="float64")
+    if window <= 1 or values.size == 0:
+        return values.copy()
+    rolled = pd.DataFrame(values.T).rolling(window, min_periods=1).median()
+    return rolled.to_numpy().T
+
+
+class RollingMedianCache:
+    """
+    Thread-safe LRU cache of rolled rows, shared by all sessions of the dashboard.
+    Rows are cached per (item, window, context), where the context holds everything else
+    the result depends on (date range, data version). Moving the window slider computes
+    all selected items in one pass, adding an item only computes that item.
+    Args:
+        max_entries: How many rolled rows are kept
+    """
+
+    def __init__(self, max_entries: int = ROLLING_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._rows: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, names: List[Hashable], values: np.ndarray, window: int, context: Hashable = None) -> np.ndarray:
+        """
+        Rolling median of the rows of an aligned array, cached per item.
+        Args:
+            names: Hashable item key per row of values, it should change when the item's data changes
+            values: (items, dates) array
+            window: The window in days
+            context: Hashable description of what else the values depend on
+        Returns:
+            np.ndarray: (items, dates) float64 array
+        """
+        if window <= 1:
+            return np.asarray(values, dtype="float64")
+        keys = [(name, window, context) for name in names]
+        out = np.empty(np.shape(values), dtype="float64")
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is None or row.shape[0] != out.shape[1]:
+                    missing.append(i)
+                else:
+                    self._rows.move_to_end(key)
+                    out[i] = row
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            rolled = rolling_median(np.asarray(values)[missing], window)
+            out[missing] = rolled
+            with self._lock:
+                for i, row in zip(missing, rolled):
+                    self._rows[keys[i]] = row
+                    self._rows.move_to_end(keys[i])
+                while len(self._rows) > self.max_entries:
+                    self._rows.popitem(last=False)
+        return out
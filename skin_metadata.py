@@ -0,0 +1,212 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# -----------------
+# CONFIG
+# -----------------
+SKINS_JSON = "csgo_skins.json"
+META_CACHE = os.path.join("data", "skin_metadata.parquet")
+META_COLUMNS = ["market_hash_name", "record", "skin", "weapon", "quality", "collection", "crate", "category", "phase", "wear"]
+CATEGORICAL_COLUMNS = ["weapon", "quality", "collection", "crate", "category", "phase", "wear"]
+SOURCE_KEY = b"skin_metadata_source"  # parquet metadata holding the fingerprint of the json
+META_VERSION = 2  # part of the fingerprint, a cache written with other columns is parsed again
+
+# Logical order of the rarities, heatmap columns follow it.
+RARITY_ORDER = [
+    "Consumer Grade", "Industrial Grade", "Mil-Spec", "Restricted",
+    "Classified", "Covert", "Contraband", "Extraordinary"
+]
+RARITY_ALIASES = {"Mil-Spec Grade": "Mil-Spec"}
+CATEGORY_OVERRIDES = {"Zeus x27": "Pistols"}  # weapon -> category used for the heatmaps
+
+
+# -----------------
+# Parsing
+# -----------------
+_NAMED = pa.struct([("name", pa.string())])
+# The fields parse_skins reads, dicts like {"name": ...} are reduced to their name and other keys are ignored.
+RECORD_SCHEMA = pa.schema([
+    ("name", pa.string()),
+    ("market_hash_name", pa.string()),
+    ("phase", pa.string()),
+    ("weapon", _NAMED),
+    ("rarity", _NAMED),
+    ("category", _NAMED),
+    ("wear", _NAMED),
+    ("wears", pa.list_(_NAMED)),
+    ("collections", pa.list_(_NAMED)),
+    ("crates", pa.list_(_NAMED)),
+])
+
+def _names(values: pa.Array) -> np.ndarray:
+    return pc.struct_field(values, "name").to_numpy(zero_copy_only=False)
+
+def _first_names(values: pa.Array) -> np.ndarray:
+    first = pc.list_slice(values, 0, 1)
+    names = np.full(len(values), None, dtype=object)
+    names[pc.list_parent_indices(first).to_numpy()] = _names(pc.list_flatten(first))
+    return names
+
+def parse_skins(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Flatten the skin records of csgo_skins.json column-wise.
+    The records are converted to an arrow table holding only RECORD_SCHEMA and the wear lists are
+    flattened, so no Python loop runs over the records. Every record gets one row per wear,
+    named like the market ("AK-47 | Redline (Field-Tested)"), records that carry a market_hash_name
+    keep it. Records that share a name (e.g. the Doppler phases) stay separate rows, told apart by
+    their record number and phase.
+    Args:
+        records: The decoded JSON list
+    Returns:
+        pd.DataFrame: META_COLUMNS, the descriptive columns are categorical
+    """
+    table = pa.Table.from_pylist(records, schema=RECORD_SCHEMA)
+    column = {name: table.column(name).combine_chunks() for name in RECORD_SCHEMA.names}
+    market_hash_names = column["market_hash_name"].to_numpy(zero_copy_only=False)
+    has_name = pd.notna(market_hash_names) & (market_hash_names != "")
+
+    # One row per named wear, records with a market hash name or without named wears get a single row.
+    wears = pd.Series(_names(pc.list_flatten(column["wears"])),
+                      index=pc.list_parent_indices(column["wears"]).to_numpy(), dtype=object).dropna()
+    wears = wears[~has_name[wears.index]]
+    single = np.setdiff1d(np.arange(table.num_rows), wears.index)
+    wears = pd.concat([wears, pd.Series(None, index=single, dtype=object)]).sort_index(kind="stable")
+    record = wears.index.to_numpy()
+
+    skin = column["name"].to_numpy(zero_copy_only=False)[record]
+    wear = np.where(has_name[record], _names(column["wear"])[record], wears.to_numpy())
+    variant = np.where(pd.isna(wear), skin, pd.Series(skin) + " (" + pd.Series(wear, dtype=object).fillna("") + ")")
+    df = pd.DataFrame({
+        "market_hash_name": np.where(has_name[record], market_hash_names[record], variant),
+        "record": record,
+        "skin": skin,
+        "weapon": _names(column["weapon"])[record],
+        "quality": _names(column["rarity"])[record],
+        "collection": _first_names(column["collections"])[record],
+        "crate": _first_names(column["crates"])[record],
+        "category": pd.Series(_names(column["category"])[record], dtype=object).fillna("Unknown").to_numpy(),
+        "phase": column["phase"].to_numpy(zero_copy_only=False)[record],
+        "wear": wear,
+    })
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
+
+
+# -----------------
+# Loader
+# -----------------
+def _source_fingerprint(json_path: str) -> str:
+    stat = os.stat(json_path)
+    return f"{os.path.abspath(json_path)}|{stat.st_mtime_ns}|{stat.st_size}|v{META_VERSION}"
+
+def load_skin_metadata(json_path: str = SKINS_JSON, cache_path: Optional[str] = META_CACHE) -> pd.DataFrame:
+    """
+    Load the skin metadata indexed by market hash name.
+    The parsed table is cached as parquet and only parsed again when the json changes.
+    Args:
+        json_path: The path of csgo_skins.json
+        cache_path: The path of the parquet cache, None disables it
+    Returns:
+        pd.DataFrame: record, skin, weapon, quality, collection, crate, category, phase and wear
+            per market hash name, names shared by several records appear once per record
+    """
+    source = _source_fingerprint(json_path).encode()
+    if cache_path and os.path.exists(cache_path):
+        table = pq.read_table(cache_path)
+        if (table.schema.metadata or {}).get(SOURCE_KEY) == source:
+            return table.to_pandas().set_index("market_hash_name")
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        df = parse_skins(json.load(f))
+
+    if cache_path:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: source})
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        pq.write_table(table, cache_path + ".tmp", compression="zstd")
+        os.replace(cache_path + ".tmp", cache_path)
+    return df.set_index("market_hash_name")
+
+def join_metadata(prices: pd.DataFrame, meta: pd.DataFrame, on: str = "item") -> pd.DataFrame:
+    """
+    Add the metadata columns to a long price table, items without metadata get NaN.
+    Records that share a market hash name (e.g. Doppler phases) are one market item,
+    the first of them is joined so no price row is repeated.
+    Args:
+        prices: Long table with the market hash name in the column on (e.g. from read_prices)
+        meta: The result of load_skin_metadata
+        on: The column holding the market hash name
+    Returns:
+        pd.DataFrame: prices with the metadata columns
+    """
+    return prices.join(meta[~meta.index.duplicated()], on=on)
+
+
+# -----------------
+# Count cube
+# -----------------
+_CUBES: Dict[str, pd.DataFrame] = {}
+
+def count_cube(meta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count the skins per category, weapon and rarity in one pass.
+    Every JSON record is counted once (not once per wear, but once per Doppler phase), rarities are named and ordered like
+    RARITY_ORDER and weapons are moved to the categories of CATEGORY_OVERRIDES.
+    Args:
+        meta: The result of load_skin_metadata
+    Returns:
+        pd.DataFrame: counts indexed by (category, weapon) with one column per rarity
+    """
+    skins = meta.drop_duplicates("record").reset_index(drop=True)  # shared names would break the alignment
+    weapon = skins["weapon"].astype(object)
+    quality = skins["quality"].astype(object).replace(RARITY_ALIASES)
+    category = weapon.map(CATEGORY_OVERRIDES).fillna(skins["category"].astype(object))
+    counts = pd.crosstab([category.rename("category"), weapon.rename("weapon")], quality.rename("quality"))
+    counts = counts.reindex(columns=[r for r in RARITY_ORDER if r in counts.columns])
+    counts.columns.name = "quality"
+    return counts
+
+def load_count_cube(json_path: str = SKINS_JSON, cache_path: Optional[str] = META_CACHE) -> pd.DataFrame:
+    """
+    The count cube of csgo_skins.json, built once per version of the file.
+    Args:
+        json_path: The path of csgo_skins.json
+        cache_path: The path of the metadata cache, see load_skin_metadata
+    Returns:
+        pd.DataFrame: see count_cube
+    """
+    source = _source_fingerprint(json_path)
+    if source not in _CUBES:
+        _CUBES.clear()
+        _CUBES[source] = count_cube(load_skin_metadata(json_path, cache_path))
+    return _CUBES[source]
+
+def cube_slice(cube: pd.DataFrame, categories: Optional[List[str]] = None,
+               exclude: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Weapon x rarity counts of some categories, ready for a heatmap.
+    Rarities and weapons without any skin in the slice are dropped.
+    Args:
+        cube: The result of count_cube
+        categories: Optional categories to keep, all otherwise
+        exclude: Optional categories to leave out
+    Returns:
+        pd.DataFrame: counts indexed by weapon with one column per rarity
+    """
+    cats = cube.index.get_level_values("category")
+    mask = np.ones(len(cube), dtype=bool)
+    if categories is not None:
+        mask &= cats.isin(categories)
+    if exclude is not None:
+        mask &= ~cats.isin(exclude)
+    data = cube[mask].groupby(level="weapon").sum()
+    data = data.loc[:, data.sum(axis=0) > 0]
+    return data[data.sum(axis=1) > 0]
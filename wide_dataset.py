@@ -0,0 +1,266 @@
+import os
+import uuid
+from datetime import datetime
+from typing import Callable, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# -----------------
+# CONFIG
+# -----------------
+DATASET_DIR = os.path.join("data", "Visual_data")
+PART_PREFIX = "part-"
+INDEX_FILE = "_index.parquet"  # the leading underscore keeps it out of dataset scans
+INDEX_COLUMNS = ["item", "start", "end", "rows", "order"]
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 16384  # rows are sorted by item, so filters on items skip most row groups
+FIRST_DATE = "2010-11-05"
+LAST_DATE = "2034-12-28"
+
+SCHEMA = pa.schema([
+    ("item", pa.string()),
+    ("date", pa.timestamp("ns")),
+    ("value", pa.float64()),
+])
+
+# -----------------
+# Helpers
+# -----------------
+def dataset_path(name: str, root: str = DATASET_DIR) -> str:
+    """
+    Build the directory of a dataset.
+    Args:
+        name: The name of the dataset
+        root: The directory holding all datasets
+    Returns:
+        str: the directory of the dataset
+    """
+    return os.path.join(root, name)
+
+def legacy_csv_path(name: str, root: str = DATASET_DIR) -> str:
+    """
+    Build the path of the wide CSV a dataset was stored in before it became a directory.
+    Args:
+        name: The name of the dataset
+        root: The directory holding all datasets
+    Returns:
+        str: the path of the csv file
+    """
+    return os.path.join(root, f"{name}.csv")
+
+def _migrate_csv(name: str, root: str) -> bool:
+    """
+    Convert the old CSV of a dataset once, if the dataset has no directory yet.
+    Returns:
+        bool: whether the dataset exists (as a directory) afterwards
+    """
+    if os.path.isdir(dataset_path(name, root)):
+        return True
+    csv_path = legacy_csv_path(name, root)
+    if not os.path.exists(csv_path):
+        return False
+    import_csv(csv_path, name, root)
+    return True
+
+def _to_long(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn a wide frame (date index, one column per item) into sorted item/date/value rows without gaps.
+    """
+    long = df.rename_axis(index="date", columns="item").stack(future_stack=True).rename("value").reset_index()
+    long = long.dropna(subset=["value"])
+    long["date"] = pd.to_datetime(long["date"])
+    long["item"] = long["item"].astype(str)
+    long["value"] = long["value"].astype("float64")
+    return long.sort_values(["item", "date"], kind="stable").reset_index(drop=True)[["item", "date", "value"]]
+
+def _write_part(path: str, rows: pd.DataFrame) -> None:
+    """
+    Write rows as a new immutable part file of the dataset.
+    """
+    os.makedirs(path, exist_ok=True)
+    name = f"{PART_PREFIX}{uuid.uuid4().hex[:12]}.parquet"
+    part = os.path.join(path, name)
+    tmp_part = os.path.join(path, f"_{name}.tmp")  # the leading underscore keeps it out of dataset scans
+    table = pa.Table.from_pandas(rows, schema=SCHEMA, preserve_index=False)
+    pq.write_table(table, tmp_part, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_part, part)
+
+def _write_index(path: str, index: pd.DataFrame) -> None:
+    index_path = os.path.join(path, INDEX_FILE)
+    index[INDEX_COLUMNS].to_parquet(index_path + ".tmp", index=False, compression=COMPRESSION)
+    os.replace(index_path + ".tmp", index_path)
+
+def read_index(name: str, root: str = DATASET_DIR) -> pd.DataFrame:
+    """
+    Read the item index of a dataset, it lists the items without touching their values.
+    Args:
+        name: The name of the dataset
+        root: The directory holding all datasets
+    Returns:
+        pd.DataFrame: item, start, end, rows and column order per item
+    """
+    index_path = os.path.join(dataset_path(name, root), INDEX_FILE)
+    if not os.path.exists(index_path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.read_parquet(index_path).sort_values("order").reset_index(drop=True)
+
+# -----------------
+# Writer
+# -----------------
+def write_dataset(df: pd.DataFrame, name: str, root: str = DATASET_DIR) -> None:
+    """
+    Create a dataset from a wide frame, an existing dataset of that name is replaced.
+    Args:
+        df: Wide frame with the date as index and one column per item
+        name: The name of the dataset
+        root: The directory holding all datasets
+    """
+    path = dataset_path(name, root)
+    if os.path.isdir(path):
+        for file in os.listdir(path):
+            if file.startswith((PART_PREFIX, "_" + PART_PREFIX)) or file == INDEX_FILE:
+                os.remove(os.path.join(path, file))
+    append_to_dataset(df, name, root)
+
+def append_to_dataset(df: pd.DataFrame, name: str, root: str = DATASET_DIR) -> int:
+    """
+    Append new items and new dates to a dataset without rewriting the stored data.
+    The new rows go into one new part file, only the small item index is rewritten.
+    For items that are already stored only dates before their first or after their last
+    stored date are added, stored values are never changed.
+    Args:
+        df: Wide frame with the date as index and one column per item
+        name: The name of the dataset
+        root: The directory holding all datasets
+    Returns:
+        int: the number of appended values
+    """
+    path = dataset_path(name, root)
+    rows = _to_long(df)
+    index = read_index(name, root)
+
+    if not index.empty and not rows.empty:
+        known = index.set_index("item")
+        start = rows["item"].map(known["start"])
+        end = rows["item"].map(known["end"])
+        rows = rows[start.isna() | (rows["date"] < start) | (rows["date"] > end)]
+    if rows.empty:
+        return 0
+
+    _write_part(path, rows)
+
+    added = rows.groupby("item", sort=False)["date"].agg(start="min", end="max", rows="size").reset_index()
+    if index.empty:
+        index = added.assign(order=range(len(added)))
+    else:
+        merged = index.merge(added, on="item", how="outer", suffixes=("", "_new"), sort=False)
+        merged["start"] = merged[["start", "start_new"]].min(axis=1)
+        merged["end"] = merged[["end", "end_new"]].max(axis=1)
+        merged["rows"] = merged["rows"].fillna(0) + merged["rows_new"].fillna(0)
+        new_items = merged["order"].isna()
+        merged.loc[new_items, "order"] = len(index) + pd.RangeIndex(int(new_items.sum()))
+        index = merged
+    index["rows"] = index["rows"].astype("int64")
+    index["order"] = index["order"].astype("int64")
+    _write_index(path, index)
+    return len(rows)
+
+def import_csv(csv_path: str, name: str, root: str = DATASET_DIR) -> None:
+    """
+    Convert a wide CSV dataset (date column plus one column per item) into a dataset.
+    Args:
+        csv_path: The path of the csv file
+        name: The name of the new dataset
+        root: The directory holding all datasets
+    """
+    write_dataset(pd.read_csv(csv_path, index_col="date", parse_dates=["date"]), name, root)
+
+# -----------------
+# Reader
+# -----------------
+def import_dataset(name: str, date_start: Union[str, datetime] = "", date_end: Union[str, datetime] = "",
+                   items: Optional[List[str]] = None, root: str = DATASET_DIR) -> pd.DataFrame:
+    """
+    Import a dataset, only the requested items and dates are read.
+    A dataset that only exists as an old CSV (see legacy_csv_path) is converted first.
+    Args:
+        name: The name of the dataset
+        date_start: Optional first date (inclusive)
+        date_end: Optional last date (inclusive)
+        items: Optional items (columns), all items otherwise
+        root: The directory holding all datasets
+    Returns:
+        pd.DataFrame: wide frame with the date as index and one column per item
+    Raises:
+        FileNotFoundError: If there is neither a dataset nor a CSV of that name
+    """
+    if not _migrate_csv(name, root):
+        raise FileNotFoundError(f"No dataset '{name}' in {root}")
+    path = dataset_path(name, root)
+    index = read_index(name, root)
+    columns = list(index["item"]) if items is None else list(items)
+    if index.empty:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name="date"), dtype="float64")
+
+    expr = None
+    for cond in (
+        ds.field("item").isin(columns) if items is not None else None,
+        ds.field("date") >= pd.Timestamp(date_start) if date_start != "" else None,
+        ds.field("date") <= pd.Timestamp(date_end) if date_end != "" else None,
+    ):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+
+    rows = ds.dataset(path, format="parquet").to_table(filter=expr).to_pandas()
+    wide = rows.pivot(index="date", columns="item", values="value")
+    wide = wide.reindex(columns=columns).sort_index()
+    wide.columns.name = None
+    return wide
+
+def navigate(df: Union[pd.DataFrame, str], items: Optional[List[str]] = None, date_start: str = FIRST_DATE,
+             date_end: str = LAST_DATE, root: str = DATASET_DIR) -> pd.DataFrame:
+    """
+    Choose specific items and a date range of a dataset.
+    Args:
+        df: A wide frame, or the name of a stored dataset which is then read partially
+        items: Optional items (columns), all items otherwise
+        date_start: First date
+        date_end: Last date
+        root: The directory holding all datasets
+    Returns:
+        pd.DataFrame: the smaller wide frame
+    """
+    if isinstance(df, str):
+        return import_dataset(df, date_start, date_end, items=items or None, root=root)
+    if not items:
+        return df.loc[date_start:date_end]
+    return df[items].loc[date_start:date_end]
+
+def add_to_dataset(items: List[str], name: str, create: Callable[[List[str]], pd.DataFrame],
+                   overwrite: bool = True, root: str = DATASET_DIR) -> pd.DataFrame:
+    """
+    Add items to a dataset, only the items that are not stored yet are created.
+    A dataset that only exists as an old CSV is converted first.
+    Args:
+        items: Item hash names
+        name: The name of the dataset
+        create: Builds the wide frame of a list of items, e.g. create_dataset of the notebook
+        overwrite: Store the new items, otherwise they are only returned
+        root: The directory holding all datasets
+    Returns:
+        pd.DataFrame: wide frame of the requested items (not the whole dataset)
+    """
+    _migrate_csv(name, root)
+    stored = set(read_index(name, root)["item"])
+    new_items = [item for item in items if item not in stored]
+    new = create(new_items) if new_items else pd.DataFrame()
+    if overwrite:
+        if not new.empty:
+            append_to_dataset(new, name, root)
+        return import_dataset(name, items=items, root=root)
+
+    old = import_dataset(name, items=[item for item in items if item in stored], root=root) if stored else pd.DataFrame()
+    return pd.concat([old, new], axis=1).reindex(columns=items)